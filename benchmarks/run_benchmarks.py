@@ -0,0 +1,289 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks for the search engine and map utilities
+
+Runs headless and offline, with fixed seeds and generated polygons, so
+every run measures the same workload. Usage:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --threshold 1.25
+    python benchmarks/run_benchmarks.py --quick --filter simulate_step
+
+With --compare the exit status is 1 if any benchmark's median time grew
+by more than the threshold ratio over the baseline.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search_algorithm_v1 import DroneSearchSimulation
+from src.area_calc_v4 import compute_area
+from src.utils.simulation_utils import create_coverage_visualization
+
+# Centre and radius (degrees) of the generated search areas, about 1 km across
+AREA_CENTER = (78.0, 20.0)
+AREA_RADIUS = 0.005
+
+# Parameter matrices: (full, quick)
+MATRICES = {
+    'simulate_step': (
+        {'n_drones': [5, 50, 500], 'grid_resolution': [50, 200], 'n_vertices': [32, 512],
+         'shape': ['convex', 'concave']},
+        {'n_drones': [5, 50], 'grid_resolution': [50], 'n_vertices': [32], 'shape': ['convex', 'concave']}
+    ),
+    'update_grid': (
+        {'n_drones': [5, 50, 500], 'grid_resolution': [50, 200], 'n_vertices': [32, 512],
+         'shape': ['convex', 'concave']},
+        {'n_drones': [5, 50], 'grid_resolution': [50], 'n_vertices': [32], 'shape': ['convex', 'concave']}
+    ),
+    'get_new_target': (
+        {'grid_resolution': [50, 200, 500], 'targeting': ['frontier', 'nearest'], 'n_vertices': [32, 512],
+         'shape': ['convex', 'concave']},
+        {'grid_resolution': [50], 'targeting': ['frontier', 'nearest'], 'n_vertices': [32], 'shape': ['concave']}
+    ),
+    'construction': (
+        {'grid_resolution': [50, 200, 1000], 'n_vertices': [32, 512, 4096], 'shape': ['convex', 'concave']},
+        {'grid_resolution': [50, 200], 'n_vertices': [32, 512], 'shape': ['concave']}
+    ),
+    'compute_area': (
+        {'n_vertices': [8, 64, 512, 4096], 'shape': ['convex', 'concave']},
+        {'n_vertices': [8, 512], 'shape': ['convex', 'concave']}
+    ),
+    'create_coverage_visualization': (
+        {'grid_resolution': [50, 200, 500]},
+        {'grid_resolution': [50]}
+    )
+}
+
+def make_polygon(n_vertices, shape):
+    """
+    Generate a deterministic (lon, lat) polygon around AREA_CENTER
+
+    Convex polygons are regular; concave ones are stars whose every other
+    vertex is pulled halfway towards the centre.
+    """
+    angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    radii = np.full(n_vertices, AREA_RADIUS)
+    if shape == 'concave':
+        radii[1::2] *= 0.5
+    lon = AREA_CENTER[0] + radii * np.cos(angles)
+    lat = AREA_CENTER[1] + radii * np.sin(angles)
+    return list(zip(lon.tolist(), lat.tolist()))
+
+def make_simulation(n_drones=5, grid_resolution=50, shape='convex', targeting='frontier', warmup=20,
+                    n_vertices=32):
+    """
+    Create a seeded simulation on an n_vertices polygon and advance it past the start
+
+    Simulations run in the metric UTM frame, where the scan footprint covers
+    a realistic part of the grid (in raw degrees it covers the whole area).
+    """
+    area = make_polygon(n_vertices, shape)
+    simulation = DroneSearchSimulation(area, n_drones=n_drones, seed=0, grid_resolution=grid_resolution,
+                                       targeting=targeting, projection='utm')
+    for _ in range(warmup):
+        simulation.advance()
+    return simulation
+
+def time_calls(function, repeat, number):
+    """Time repeat batches of number calls; returns per-call times in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number * 1e3)
+    return np.array(times)
+
+def bench_simulate_step(n_drones, grid_resolution, n_vertices, shape):
+    simulation = make_simulation(n_drones, grid_resolution, shape, n_vertices=n_vertices)
+    return lambda: simulation.simulate_step(output='delta')
+
+def bench_update_grid(n_drones, grid_resolution, n_vertices, shape):
+    simulation = make_simulation(n_drones, grid_resolution, shape, n_vertices=n_vertices)
+    return simulation.update_grid
+
+def bench_get_new_target(grid_resolution, targeting, n_vertices, shape):
+    simulation = make_simulation(5, grid_resolution, shape, targeting, n_vertices=n_vertices)
+    # Mark coverage as changed every call, as a step would, so nearest targeting
+    # checks its cached KD-tree cells against the grid
+    def get_target():
+        simulation.coverage_version += 1
+        simulation.get_new_target(0, simulation.drone_positions[0])
+    return get_target
+
+def bench_construction(grid_resolution, n_vertices, shape):
+    # Setup cost: projecting the polygon and building the area mask, signed
+    # distance field and frontier index
+    area = make_polygon(n_vertices, shape)
+    return lambda: DroneSearchSimulation(area, n_drones=5, seed=0, grid_resolution=grid_resolution,
+                                         projection='utm')
+
+def bench_compute_area(n_vertices, shape):
+    polygon = make_polygon(n_vertices, shape)
+    return lambda: compute_area(polygon, 'km2')
+
+def bench_create_coverage_visualization(grid_resolution):
+    grid = np.random.default_rng(0).random((grid_resolution, grid_resolution))
+    return lambda: create_coverage_visualization(grid)
+
+# Calls per timed batch; fixed so that every run performs the same work
+NUMBERS = {
+    'simulate_step': 20,
+    'update_grid': 20,
+    'get_new_target': 50,
+    'construction': 3,
+    'compute_area': 50,
+    'create_coverage_visualization': 3
+}
+
+BENCHMARKS = {
+    'simulate_step': bench_simulate_step,
+    'update_grid': bench_update_grid,
+    'get_new_target': bench_get_new_target,
+    'construction': bench_construction,
+    'compute_area': bench_compute_area,
+    'create_coverage_visualization': bench_create_coverage_visualization
+}
+
+def get_cases(quick=False, name_filter=None):
+    """List (name, params) of every benchmark case in the selected matrices"""
+    cases = []
+    for name, matrices in MATRICES.items():
+        if name_filter and name_filter not in name:
+            continue
+        matrix = matrices[1] if quick else matrices[0]
+        keys = list(matrix.keys())
+        for values in itertools.product(*(matrix[key] for key in keys)):
+            cases.append((name, dict(zip(keys, values))))
+    return cases
+
+def get_case_key(name, params):
+    """Stable identifier of a benchmark case, used to match results to a baseline"""
+    return name + '[' + ','.join(f"{key}={params[key]}" for key in sorted(params)) + ']'
+
+def run_benchmarks(quick=False, name_filter=None, repeat=5, log=print):
+    """
+    Run the benchmark matrix
+
+    Parameters:
+    -----------
+    quick : bool
+        Use the reduced matrices
+    name_filter : str, optional
+        Only run benchmarks whose name contains this string
+    repeat : int
+        Number of timed batches per case (see NUMBERS for the batch sizes)
+    log : function
+        Function to call with progress messages
+
+    Returns:
+    --------
+    dict
+        'meta' with the environment and 'results' with one entry per case
+    """
+    results = []
+    for name, params in get_cases(quick, name_filter):
+        function = BENCHMARKS[name](**params)
+        number = NUMBERS[name]
+        # One untimed call to warm up caches
+        function()
+        times = time_calls(function, repeat, number)
+        key = get_case_key(name, params)
+        results.append({
+            'key': key,
+            'name': name,
+            'params': params,
+            'calls': number * repeat,
+            'median_ms': float(np.median(times)),
+            'min_ms': float(times.min()),
+            'max_ms': float(times.max())
+        })
+        log(f"{key:70s} {np.median(times):10.3f} ms")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'quick': quick,
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+def compare_results(current, baseline, threshold=1.25):
+    """
+    Compare benchmark results with a baseline
+
+    Parameters:
+    -----------
+    current, baseline : dict
+        Results as returned by run_benchmarks
+    threshold : float
+        Ratio of current to baseline median time above which a case counts as a regression
+
+    Returns:
+    --------
+    list of dict
+        One entry per case present in both, with 'key', 'baseline_ms',
+        'current_ms', 'ratio' and 'regression'
+    """
+    baseline_times = {result['key']: result['median_ms'] for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        if result['key'] not in baseline_times:
+            continue
+        ratio = result['median_ms'] / baseline_times[result['key']]
+        comparison.append({
+            'key': result['key'],
+            'baseline_ms': baseline_times[result['key']],
+            'current_ms': result['median_ms'],
+            'ratio': ratio,
+            'regression': ratio > threshold
+        })
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search engine and map utilities")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file to compare the results with")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Slowdown ratio counted as a regression in compare mode (default 1.25)")
+    parser.add_argument('--quick', action='store_true', help="Run the reduced parameter matrices")
+    parser.add_argument('--filter', help="Only run benchmarks whose name contains this string")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed batches per case (default 5)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.quick, args.filter, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparison = compare_results(results, baseline, args.threshold)
+        print()
+        for entry in comparison:
+            flag = "REGRESSION" if entry['regression'] else ""
+            print(f"{entry['key']:70s} {entry['baseline_ms']:10.3f} -> {entry['current_ms']:10.3f} ms "
+                  f"x{entry['ratio']:.2f} {flag}")
+        regressions = sum(entry['regression'] for entry in comparison)
+        print(f"\n{len(comparison)} cases compared, {regressions} regressions (threshold x{args.threshold})")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,9 @@
 # src/area_calc.py
 
 from shapely.geometry import Polygon
-from pyproj import Transformer
+import numpy as np
 from src.config_v4 import UNITS
+from src.utils.projection_utils import get_transformer
 
 def compute_area(polygon_coords, unit: str = "km2") -> float:
     """
@@ -32,9 +33,11 @@ def compute_area(polygon_coords, unit: str = "km2") -> float:
         geo_poly = geo_poly.buffer(0)
 
     # 2. Project to an equal-area CRS (World Mollweide: ESRI:54009)
-    transformer = Transformer.from_crs("EPSG:4326", "ESRI:54009", always_xy=True)
-    projected_coords = [transformer.transform(lon, lat) for lon, lat in polygon_coords]
-    proj_poly = Polygon(projected_coords)
+    #    (cached transformer, all vertices in one batched call)
+    transformer = get_transformer("EPSG:4326", "ESRI:54009")
+    coords = np.asarray(polygon_coords, dtype=float)
+    projected_x, projected_y = transformer.transform(coords[:, 0], coords[:, 1])
+    proj_poly = Polygon(np.column_stack((projected_x, projected_y)))
 
     # 3. Compute area in square metres
     area_m2 = proj_poly.area
@@ -1,11 +1,22 @@
 # src/map_viewer_v4.py
 
-from ipyleaflet import Map, WMSLayer, TileLayer, DrawControl, CircleMarker, Polygon, Polyline
-from src.config_v4 import WMS_URL, WMS_VERSION, DEFAULT_CENTER, DEFAULT_ZOOM, EXTERNAL_BASEMAPS
+import base64
+import time
+import numpy as np
+from ipyleaflet import (Map, WMSLayer, TileLayer, DrawControl, CircleMarker, Polygon, Polyline, ImageOverlay,
+                        GeoJSON)
+from src.config_v4 import WMS_URL, WMS_VERSION, DEFAULT_CENTER, DEFAULT_ZOOM, EXTERNAL_BASEMAPS, DRONE_COLORS
+from src.utils.simulation_utils import render_coverage_png
+from src.utils.track_utils import TrackLOD, get_zoom_tolerance, simplify_track
 
 class MapViewer:
-    def __init__(self, center=DEFAULT_CENTER, zoom=DEFAULT_ZOOM, layers=None):
-        """Initialize the map viewer with the specified center and zoom level"""
+    def __init__(self, center=DEFAULT_CENTER, zoom=DEFAULT_ZOOM, layers=None, track_tolerance_pixels=1.0):
+        """
+        Initialize the map viewer with the specified center and zoom level
+        
+        Drone paths are simplified to within track_tolerance_pixels screen
+        pixels at the current zoom level before they are sent to the map.
+        """
         # Initialize the map
         self.map = Map(center=center, zoom=zoom)
         
@@ -14,6 +25,30 @@ class MapViewer:
         self._overlay_layers = {}
         self._simulation_layers = []
         
+        # Live coverage overlay, created once and then only given new images
+        self._coverage_overlay = None
+        
+        # Live drone markers and paths, one GeoJSON layer whose data is
+        # replaced once per frame
+        self._drone_layer = None
+        self._drone_positions = []
+        self._drone_styles = []
+        
+        # One-off path lines and their full paths, re-simplified on zoom
+        self._path_lines = []
+        
+        # Drone paths as last given (raw), or as growing level-of-detail
+        # tracks fed from a simulation's full history
+        self._drone_paths = None
+        self._track_lod = None
+        self._track_source = None
+        self._track_steps = 0
+        self.track_tolerance_pixels = track_tolerance_pixels
+        self._track_zoom = None
+        
+        # Time of the last pushed update of each live layer, for rate limiting
+        self._pushed_at = {}
+        
         # Current drawn shape
         self.current_polygon = None
         
@@ -26,6 +61,9 @@ class MapViewer:
         # Attach draw control
         self.draw_control = self._make_draw_control()
         self.map.add_control(self.draw_control)
+        
+        # Re-send simplified drone paths when the zoom level changes
+        self.map.observe(self._on_zoom_change, names='zoom')
 
     def _make_draw_control(self):
         """Create a draw control with polygons and rectangles enabled"""
@@ -136,26 +174,239 @@ class MapViewer:
         return marker
         
     def add_drone_path(self, path, color="blue", weight=2, opacity=0.7):
-        """Add a path line for a drone's movement history"""
+        """Add a path line for a drone's movement history, re-simplified when the zoom changes"""
         # Need at least 2 points for a path
         if len(path) < 2:
             return None
             
+        path = np.asarray(path, dtype=float)
         path_line = Polyline(
-            locations=path,
+            locations=simplify_track(path, self.get_track_tolerance()).tolist(),
             color=color,
             weight=weight,
             opacity=opacity
         )
         self.map.add_layer(path_line)
         self._simulation_layers.append(path_line)
+        self._path_lines.append((path_line, path))
         return path_line
         
+    def update_coverage_overlay(self, exploration_grid, bounds, min_interval=0.1, opacity=1.0, force=False):
+        """
+        Show the coverage grid as a georeferenced image over the search area
+        
+        The overlay layer is added on the first call; later calls only send
+        a newly encoded image (and the bounds if they changed). Updates that
+        arrive within min_interval seconds of the last one are dropped before
+        any encoding, so the map stays smooth however often it is called.
+        
+        Parameters:
+        -----------
+        exploration_grid : np.ndarray
+            Coverage values in [0, 1], row 0 at the south edge
+        bounds : tuple
+            ((south, west), (north, east)) of the grid, e.g. from
+            DroneSearchSimulation.get_coverage_bounds()
+        min_interval : float
+            Minimum number of seconds between two pushed images
+        opacity : float
+            Opacity of the overlay layer
+        force : bool
+            Push the image even if the last one was pushed less than min_interval ago
+            
+        Returns:
+        --------
+        bool
+            True if a new image was pushed
+        """
+        if not self._throttle('coverage', min_interval, force):
+            return False
+        
+        # Image rows run from north to south
+        png = render_coverage_png(np.flipud(exploration_grid), value_range=(0, 1))
+        url = "data:image/png;base64," + base64.b64encode(png).decode('ascii')
+        bounds = tuple(tuple(corner) for corner in bounds)
+        
+        if self._coverage_overlay is None:
+            self._coverage_overlay = ImageOverlay(url=url, bounds=bounds, opacity=opacity)
+            self.map.add_layer(self._coverage_overlay)
+        else:
+            if tuple(tuple(corner) for corner in self._coverage_overlay.bounds) != bounds:
+                self._coverage_overlay.bounds = bounds
+            self._coverage_overlay.url = url
+        return True
+        
+    def clear_coverage_overlay(self):
+        """Remove the coverage overlay"""
+        if self._coverage_overlay is not None:
+            self.map.remove_layer(self._coverage_overlay)
+            self._coverage_overlay = None
+            self._pushed_at.pop('coverage', None)
+    
+    def update_drones(self, positions, paths=None, colors=None, radius=5, weight=2, opacity=0.7):
+        """
+        Show drones and their recent paths, sending one update per frame
+        
+        The markers and path lines are the features of one GeoJSON layer
+        that is added to the map once. Later calls replace the layer's data,
+        so each frame is a single widget sync whatever the number of drones.
+        The styles are rebuilt only if the drone count changes.
+        
+        Parameters:
+        -----------
+        positions : array-like
+            Drone positions in (lat, lon) order, shape (n_drones, 2)
+        paths : array-like, optional
+            Recent path of each drone in (lat, lon) order, shape (n_drones, length, 2),
+            simplified for the current zoom level before it is sent. If omitted,
+            the full tracks fed by show_simulation are used, if any
+        colors : list of str, optional
+            Color of each drone (defaults to DRONE_COLORS)
+        radius : int
+            Marker radius in pixels
+        weight : int
+            Path line width in pixels
+        opacity : float
+            Path line opacity
+        """
+        positions = np.asarray(positions, dtype=float)
+        
+        if self._drone_layer is None or len(self._drone_positions) != len(positions):
+            self.clear_drones()
+            if colors is None:
+                colors = [DRONE_COLORS[i % len(DRONE_COLORS)] for i in range(len(positions))]
+            self._drone_styles = [
+                ({'color': color, 'weight': weight, 'opacity': opacity},
+                 {'color': color, 'fillColor': color, 'fillOpacity': 0.8, 'weight': 2})
+                for color in colors
+            ]
+            self._drone_layer = GeoJSON(data={'type': 'FeatureCollection', 'features': []},
+                                        point_style={'radius': radius})
+            self.map.add_layer(self._drone_layer)
+        
+        self._drone_positions = positions
+        self._drone_paths = paths
+        self._send_drones()
+    
+    def _send_drones(self):
+        """Replace the drone layer's features with the current positions and simplified paths"""
+        paths = self._get_simplified_paths(len(self._drone_positions))
+        # GeoJSON coordinates are (lon, lat); paths are drawn first so that markers are on top
+        lines = [
+            {'type': 'Feature', 'properties': {'style': line_style},
+             'geometry': {'type': 'LineString', 'coordinates': path[:, ::-1].tolist()}}
+            for path, (line_style, _) in zip(paths, self._drone_styles) if len(path) >= 2
+        ]
+        markers = [
+            {'type': 'Feature', 'properties': {'style': marker_style},
+             'geometry': {'type': 'Point', 'coordinates': position}}
+            for position, (_, marker_style) in zip(self._drone_positions[:, ::-1].tolist(), self._drone_styles)
+        ]
+        self._drone_layer.data = {'type': 'FeatureCollection', 'features': lines + markers}
+    
+    def get_track_tolerance(self):
+        """Get the path simplification tolerance in degrees at the current zoom level"""
+        self._track_zoom = int(round(self.map.zoom))
+        return get_zoom_tolerance(self._track_zoom, self.track_tolerance_pixels)
+    
+    def _get_simplified_paths(self, n_drones):
+        """Simplify the current drone paths for the current zoom level, as (lat, lon) arrays"""
+        tolerance = self.get_track_tolerance()
+        if self._drone_paths is not None:
+            return [simplify_track(path, tolerance) for path in self._drone_paths]
+        if self._track_lod is not None:
+            return [self._track_lod.get(i, tolerance) for i in range(n_drones)]
+        return [np.empty((0, 2)) for _ in range(n_drones)]
+    
+    def _on_zoom_change(self, change):
+        """Re-send the drone and one-off paths once the zoom has changed by a whole level"""
+        if int(round(change['new'])) == self._track_zoom:
+            return
+        if self._drone_layer is not None:
+            self._send_drones()
+        if self._path_lines:
+            tolerance = self.get_track_tolerance()
+            for line, path in self._path_lines:
+                line.locations = simplify_track(path, tolerance).tolist()
+    
+    def clear_drones(self):
+        """Remove the live drone markers and paths"""
+        if self._drone_layer is not None:
+            self.map.remove_layer(self._drone_layer)
+            self._drone_layer = None
+            self._drone_positions = []
+            self._drone_styles = []
+            self._drone_paths = None
+    
+    def show_simulation(self, simulation, min_interval=0.1, force=False, max_image_size=1024):
+        """
+        Show the current state of a simulation: drones, paths and coverage
+        
+        Calls arriving within min_interval seconds of the last shown frame
+        are dropped before any coordinates are converted or images encoded.
+        
+        Parameters:
+        -----------
+        simulation : DroneSearchSimulation
+            The simulation to show
+        min_interval : float
+            Minimum number of seconds between two shown frames
+        force : bool
+            Show the frame even if the last one was shown less than min_interval ago
+        max_image_size : int
+            Largest side in pixels of the coverage image; larger grids are
+            subsampled to about this size, near screen resolution
+        
+        Returns:
+        --------
+        bool
+            True if the frame was shown
+        """
+        if not self._throttle('simulation', min_interval, force):
+            return False
+        
+        # Grid (x, y) converts to (lon, lat); leaflet wants (lat, lon)
+        positions = simulation.grid_to_coords(simulation.drone_positions)[:, ::-1]
+        tracks = simulation.tracks
+        if tracks.keep_history:
+            # Full tracks: convert only the positions recorded since the last frame
+            if self._track_source is not tracks or self._track_steps > tracks.steps:
+                self._track_lod = TrackLOD(simulation.n_drones)
+                self._track_source = tracks
+                self._track_steps = 0
+            new_positions = tracks.history(start=self._track_steps)
+            self._track_lod.append(simulation.grid_to_coords(new_positions)[..., ::-1])
+            self._track_steps = tracks.steps
+            paths = None
+        else:
+            self._track_lod = None
+            self._track_source = None
+            paths = simulation.grid_to_coords(tracks.recent())[..., ::-1]
+        self.update_drones(positions, paths)
+        
+        # Resampled onto a lon/lat-aligned raster in projected frames
+        coverage, bounds = simulation.get_coverage_overlay(max_image_size)
+        self.update_coverage_overlay(coverage, bounds, force=True)
+        return True
+    
+    def _throttle(self, name, min_interval, force=False):
+        """Check whether an update of a live layer may be pushed now, and record it if so"""
+        now = time.monotonic()
+        last = self._pushed_at.get(name)
+        if not force and last is not None and now - last < min_interval:
+            return False
+        self._pushed_at[name] = now
+        return True
+        
     def clear_simulation_layers(self):
-        """Remove all simulation-related layers (drones, paths)"""
+        """Remove all simulation-related layers (drones, paths, coverage overlay)"""
         for layer in self._simulation_layers:
             self.map.remove_layer(layer)
         self._simulation_layers = []
+        self._path_lines = []
+        self.clear_drones()
+        self.clear_coverage_overlay()
+        self._pushed_at = {}
         
     def remove_overlay(self, layer_id):
         """Remove a specific overlay by ID"""
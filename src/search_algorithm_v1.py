@@ -1,17 +1,23 @@
 # src/search_algorithm_v4.py
 
+import heapq
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
 import matplotlib.path as mpath
-from matplotlib.collections import LineCollection
-import random
-import math
-from scipy.ndimage import gaussian_filter
-from IPython.display import clear_output
+from scipy.spatial import cKDTree
+from src.utils.track_utils import TrackStore
+from src.utils.projection_utils import get_local_crs, project_coords, unproject_coords
+from src.utils.profile_utils import PhaseProfiler
+from src.utils.kernel_utils import resolve_kernel_backend, stamp_footprints, steer_and_move, count_crossings
+from src.utils.grid_utils import (AreaMask, FrontierIndex, DenseCoverageGrid, TiledCoverageGrid,
+                                  SignedDistanceField, bilinear_sample, capsule_cells,
+                                  segment_falloff_integral)
 
 class DroneSearchSimulation:
-    def __init__(self, area_coords, n_drones=5, boundary_padding=10):
+    def __init__(self, area_coords, n_drones=5, boundary_padding=10, seed=None, grid_resolution=50,
+                 targeting='frontier', coverage_store='dense', tile_size=64, coverage_dtype='float64',
+                 path_length=50, keep_history=False, history_spill_dir=None, time_step=1.0,
+                 swept_coverage=False, kernel_backend='auto', projection=None, cell_size=None,
+                 profile=False):
         """
         Initialize the drone search simulation
         
@@ -23,79 +29,359 @@ class DroneSearchSimulation:
             Number of drones to use in the simulation
         boundary_padding : int
             Padding distance from the boundary
+        seed : int or numpy.random.Generator, optional
+            Seed or generator for all randomness in the simulation, so that
+            runs are reproducible and independent of other simulations
+        grid_resolution : int
+            Number of coverage grid cells along each side of the search area
+        targeting : str
+            How drones pick new targets: 'frontier' draws a random cell from the
+            least explored ones, 'nearest' flies to the closest uncovered cell
+        coverage_store : str
+            'dense' keeps the coverage grid in one array, 'tiled' allocates
+            tiles only where drones have scanned (for large search areas)
+        tile_size : int
+            Side length in cells of the tiles used by the tiled store, the
+            frontier index and the signed distance field
+        coverage_dtype : str
+            Storage type of the coverage grid: 'float64', 'float32', or 'uint16'
+            / 'uint8' fixed point with saturating adds (2-8x less memory)
+        path_length : int
+            Number of recent positions kept per drone in drone_paths
+        keep_history : bool
+            Keep every drone position for post-mission review (see get_track_history)
+        history_spill_dir : str, optional
+            Directory to which full history chunks are spilled as memory-mapped
+            files, in a new subdirectory per simulation
+        time_step : float
+            Duration of a step; drones move velocity * time_step per step
+        swept_coverage : bool
+            Stamp the swept path (capsule) between each drone's previous and new
+            position instead of only the new position, so that larger time
+            steps leave no gaps in coverage
+        kernel_backend : str
+            Backend of the stamping, movement and coverage counting kernels:
+            'numba' compiles them (requires Numba), 'numpy' runs them
+            vectorized and 'auto' uses Numba when it is installed. Both give
+            bit-identical results
+        projection : str, optional
+            Run the simulation in a local metric frame: 'utm' (the UTM zone of
+            the area) or 'equal_area' (Lambert azimuthal equal-area centred on
+            the area). Grid units are then metres and cells are square, so
+            scan_radius, boundary_padding and drone speeds are in metres (per
+            step). By default the lon/lat extent is stretched to a square grid
+        cell_size : float, optional
+            Largest side length of a grid cell in grid units (metres with a
+            projection); overrides grid_resolution
+        profile : bool
+            Record how long each phase of a step takes (targets, movement,
+            boundary, grid_update with accumulate, frontier and coverage_count); see
+            self.profiler and get_profile_stats
         """
+        if targeting not in ('frontier', 'nearest'):
+            raise ValueError(f"Unsupported targeting '{targeting}'. Choose from ['frontier', 'nearest']")
+        if coverage_store not in ('dense', 'tiled'):
+            raise ValueError(f"Unsupported coverage store '{coverage_store}'. Choose from ['dense', 'tiled']")
+        
         self.area_coords = area_coords
         self.n_drones = n_drones
         self.boundary_padding = boundary_padding
+        self.rng = np.random.default_rng(seed)
+        self.targeting = targeting
+        self.time_step = time_step
+        self.swept_coverage = swept_coverage
+        self.kernel_backend = resolve_kernel_backend(kernel_backend)
+        self.profiler = PhaseProfiler(profile)
+        self.step_count = 0
+        
+        # Project the area once into the local metric frame, if any
+        coords = np.asarray(area_coords, dtype=float)
+        self.projection = projection
+        self.crs = None
+        if projection is not None:
+            self.crs = get_local_crs(*coords.mean(axis=0), projection)
+            coords = project_coords(coords, self.crs)
         
         # Extract min/max coordinates for conversion
-        self.min_x = min(coord[0] for coord in area_coords)
-        self.min_y = min(coord[1] for coord in area_coords)
-        self.max_x = max(coord[0] for coord in area_coords)
-        self.max_y = max(coord[1] for coord in area_coords)
+        self.min_x, self.min_y = coords.min(axis=0)
+        self.max_x, self.max_y = coords.max(axis=0)
         
         # Calculate grid size based on the area
         self.width = self.max_x - self.min_x
         self.height = self.max_y - self.min_y
         self.grid_size = max(self.width, self.height)
         
+        # Extent mapped onto the grid along each axis: a square in the metric
+        # frame, otherwise the area's own width and height
+        if self.crs is None:
+            self.extent = np.array([self.width, self.height])
+        else:
+            self.extent = np.array([self.grid_size, self.grid_size])
+        
         # Internal parameters
         self.drone_radius = 5
         self.scan_radius = 2 * self.drone_radius
+        self.arrival_radius = 5
+        self.coverage_threshold = 0.2  # Threshold for "covered"
         
         # Setup grid for coverage tracking
-        self.grid_resolution = 50
-        self.exploration_grid = np.zeros((self.grid_resolution, self.grid_resolution))
+        if cell_size is not None:
+            grid_resolution = max(1, int(np.ceil(self.grid_size / cell_size)))
+        self.grid_resolution = grid_resolution
+        grid_shape = (self.grid_resolution, self.grid_resolution)
+        self.coverage_store = coverage_store
+        if coverage_store == 'tiled':
+            self.coverage = TiledCoverageGrid(grid_shape, tile_size, coverage_dtype, self.kernel_backend)
+        else:
+            self.coverage = DenseCoverageGrid(grid_shape, coverage_dtype, self.kernel_backend)
+        self._scan_kernels = {}
         
         # Initialize drone positions at a starting point (e.g., first point of polygon)
+        # Drone state is held as contiguous (n_drones, 2) arrays
         self.start_point = self.convert_coords_to_grid(self.area_coords[0])
-        self.drone_positions = []
-        for i in range(self.n_drones):
-            # Spread drones slightly at the starting point
-            x = self.start_point[0] + np.random.randint(-10, 10)
-            y = self.start_point[1] + np.random.randint(-10, 10)
-            x = max(self.boundary_padding, min(self.grid_size - self.boundary_padding, x))
-            y = max(self.boundary_padding, min(self.grid_size - self.boundary_padding, y))
-            self.drone_positions.append([x, y])
+        # Spread drones slightly at the starting point
+        offsets = self.rng.integers(-10, 10, size=(self.n_drones, 2))
+        self.drone_positions = np.clip(
+            np.asarray(self.start_point, dtype=float) + offsets,
+            self.boundary_padding,
+            self.grid_size - self.boundary_padding
+        )
         
         # Initialize drone path history and velocities
-        self.drone_paths = [[] for _ in range(self.n_drones)]
-        self.drone_velocities = []
-        self.drone_targets = []
-        
-        for _ in range(self.n_drones):
-            angle = 2 * np.pi * np.random.random()
-            speed = 2 + np.random.random() * 2
-            vx = speed * np.cos(angle)
-            vy = speed * np.sin(angle)
-            self.drone_velocities.append([vx, vy])
-            self.drone_targets.append(None)
+        self.tracks = TrackStore(self.n_drones, path_length, keep_history, spill_dir=history_spill_dir)
+        draws = self.rng.random((self.n_drones, 2))
+        angle = 2 * np.pi * draws[:, 0]
+        speed = 2 + draws[:, 1] * 2
+        self.drone_velocities = np.column_stack((speed * np.cos(angle), speed * np.sin(angle)))
+        
+        # Rows of NaN mark drones without a target
+        self.drone_targets = np.full((self.n_drones, 2), np.nan)
         
         # Create polygon path for point-in-polygon testing
-        self.area_path = mpath.Path(self.convert_polygon_to_grid(self.area_coords))
+        grid_polygon = np.asarray(self.convert_polygon_to_grid(self.area_coords), dtype=float)
+        self.area_path = mpath.Path(grid_polygon)
+        
+        # Polygon centroid, a fallback direction where the boundary normal is undefined
+        self.area_center = grid_polygon.mean(axis=0)
+        
+        # Rasterize the search area once into runs of cells whose center is inside
+        cell_size = self.grid_size / self.grid_resolution
+        self.area_mask = AreaMask(grid_polygon, grid_shape, cell_size)
+        self._explorable_cells = len(self.area_mask)
+        
+        # Running count of inside cells above the coverage threshold
+        self.covered_cells = 0
+        
+        # Flat indices and new values of the cells changed by the last grid update
+        self.last_changes = (np.empty(0, dtype=np.intp), np.empty(0))
+        
+        # Signed distance field for O(1) inside tests and boundary normals,
+        # stored in tiles near the boundary
+        self.signed_distance = SignedDistanceField(grid_polygon, self.area_mask, cell_size, tile_size)
+        
+        # Least explored inside cells, kept up to date by update_grid
+        self.frontier = FrontierIndex(self.area_mask, tile_size=tile_size)
+        
+        # Incremented whenever coverage changes, so derived caches know when to rebuild
+        self.coverage_version = 0
+        
+        # KD-tree over uncovered cells for nearest targeting (see get_uncovered_tree)
+        self._uncovered_tree = None
+        self._uncovered_tree_version = None
+        self._uncovered_tree_covered = 0
+        
+        # Step and preview cell under each pixel of the lon/lat-aligned overlay (see get_coverage_overlay)
+        self._overlay_cells = None
+    
+    @property
+    def drone_paths(self):
+        """Recent positions of every drone as lists of (x, y) tuples"""
+        return [[tuple(point) for point in path] for path in self.tracks.recent().tolist()]
+    
+    def get_track_history(self, drone_id=None):
+        """
+        Get every recorded position (requires keep_history=True)
+        
+        Parameters:
+        -----------
+        drone_id : int, optional
+            Drone index; all drones if omitted
+        
+        Returns:
+        --------
+        np.ndarray
+            Grid positions, shape (steps, 2) for one drone or (steps, n_drones, 2)
+        """
+        return self.tracks.history(drone_id)
+    
+    @property
+    def inside_mask(self):
+        """Cells whose center is inside the search area, as a dense (row, column) array"""
+        return self.area_mask.to_array()
+    
+    @property
+    def exploration_grid(self):
+        """Coverage values as a dense (row, column) array"""
+        return self.coverage.to_array(copy=False)
+    
+    def get_coverage_preview(self, max_size=1024):
+        """
+        Get the coverage values subsampled to at most max_size cells per side
+        
+        Only every k-th row and column is read, so large tiled grids are never
+        assembled densely.
+        
+        Parameters:
+        -----------
+        max_size : int
+            Largest side of the returned array, e.g. near screen resolution
+        
+        Returns:
+        --------
+        np.ndarray
+            Coverage values, indexed (row, column)
+        """
+        step = max(1, -(-self.grid_resolution // max_size))
+        return self.coverage.to_array(step=step)
+    
+    def coords_to_grid(self, coords):
+        """
+        Convert real-world (lon, lat) coordinates to grid coordinates
+        
+        Parameters:
+        -----------
+        coords : array-like
+            Coordinates, shape (..., 2); projected in one batched call in the metric frame
+        
+        Returns:
+        --------
+        np.ndarray
+            Grid coordinates, same shape as coords
+        """
+        coords = np.asarray(coords, dtype=float)
+        if self.crs is not None:
+            coords = project_coords(coords, self.crs)
+        origin = np.array([self.min_x, self.min_y])
+        return ((coords - origin) / self.extent) * self.grid_size
+    
+    def grid_to_coords(self, points):
+        """
+        Convert grid coordinates to real-world (lon, lat) coordinates
+        
+        Parameters:
+        -----------
+        points : array-like
+            Grid coordinates, shape (..., 2); unprojected in one batched call in the metric frame
+        
+        Returns:
+        --------
+        np.ndarray
+            Real-world coordinates, same shape as points
+        """
+        points = np.asarray(points, dtype=float)
+        origin = np.array([self.min_x, self.min_y])
+        coords = origin + (points / self.grid_size) * self.extent
+        if self.crs is not None:
+            coords = unproject_coords(coords, self.crs)
+        return coords
     
     def convert_coords_to_grid(self, coord):
         """Convert a real-world coordinate to a grid coordinate"""
-        # Scale to grid size
-        grid_x = ((coord[0] - self.min_x) / self.width) * self.grid_size
-        grid_y = ((coord[1] - self.min_y) / self.height) * self.grid_size
-        return [grid_x, grid_y]
+        return self.coords_to_grid(coord).tolist()
     
     def convert_polygon_to_grid(self, coords_list):
         """Convert all polygon coordinates to grid coordinates"""
-        return [self.convert_coords_to_grid(coord) for coord in coords_list]
+        return self.coords_to_grid(coords_list).tolist()
     
     def convert_grid_to_coords(self, grid_point):
         """Convert a grid coordinate back to a real-world coordinate"""
-        # Scale from grid size back to real-world coordinates
-        real_x = self.min_x + (grid_point[0] / self.grid_size) * self.width
-        real_y = self.min_y + (grid_point[1] / self.grid_size) * self.height
-        return [real_x, real_y]
+        return self.grid_to_coords(grid_point).tolist()
         
     def is_point_inside_area(self, point):
         """Check if a point is inside the defined search area"""
         return self.area_path.contains_point(point)
     
+    def get_signed_distance(self, points):
+        """
+        Look up the signed distance to the search area boundary (negative inside)
+        
+        Parameters:
+        -----------
+        points : np.ndarray
+            Grid positions, shape (n, 2)
+        
+        Returns:
+        --------
+        np.ndarray
+            Bilinearly interpolated signed distances, shape (n,)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        cell_size = self.grid_size / self.grid_resolution
+        # Cell centers sit at (i + 0.5) cells
+        u = points[:, 0] / cell_size - 0.5
+        v = points[:, 1] / cell_size - 0.5
+        distances = bilinear_sample(self.signed_distance, u, v)
+        
+        # Positions beyond the grid are outside the area by at least their distance to the grid
+        beyond = np.maximum(np.maximum(-points[:, 0], points[:, 0] - self.grid_size),
+                            np.maximum(-points[:, 1], points[:, 1] - self.grid_size))
+        return np.maximum(distances, beyond)
+    
+    def is_outside(self, points):
+        """
+        Test which grid positions lie outside the search area
+        
+        The signed distance field decides away from the boundary. Within a
+        cell of it, where interpolating between cell centers can misplace the
+        edge, the polygon itself is tested, so only drones near the edge pay
+        for an exact test.
+        
+        Parameters:
+        -----------
+        points : np.ndarray
+            Grid positions, shape (n, 2)
+        
+        Returns:
+        --------
+        np.ndarray of bool
+            True for positions outside the area, shape (n,)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        distances = self.get_signed_distance(points)
+        outside = distances >= 0
+        near = np.flatnonzero(np.abs(distances) < self.grid_size / self.grid_resolution)
+        if near.size:
+            outside[near] = ~self.area_path.contains_points(points[near])
+        return outside
+    
+    def get_boundary_normals(self, points):
+        """
+        Get unit normals pointing out of the search area (the signed distance gradient)
+        
+        Parameters:
+        -----------
+        points : np.ndarray
+            Grid positions, shape (n, 2)
+        
+        Returns:
+        --------
+        np.ndarray
+            Unit normals, shape (n, 2)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        cell_size = self.grid_size / self.grid_resolution
+        # Central differences of the interpolated field, one cell apart, in one lookup
+        steps = np.array([[cell_size, 0.0], [-cell_size, 0.0], [0.0, cell_size], [0.0, -cell_size]])
+        samples = self.get_signed_distance((points + steps[:, None]).reshape(-1, 2)).reshape(4, -1)
+        normals = np.column_stack((samples[0] - samples[1], samples[2] - samples[3]))
+        
+        # Where the field is flat, point away from the polygon centroid instead
+        length = np.sqrt(np.sum(normals * normals, axis=1))
+        flat = length == 0
+        normals[flat] = points[flat] - self.area_center
+        length[flat] = np.sqrt(np.sum(normals[flat] * normals[flat], axis=1))
+        return normals / np.maximum(length, 1e-12)[:, None]
+    
     def get_exploration_score(self, x, y):
         """Calculate exploration score for a point (lower is better)"""
         # Convert position to grid index
@@ -105,180 +391,806 @@ class DroneSearchSimulation:
         grid_y = max(0, min(self.grid_resolution-1, grid_y))
         
         # Calculate score based on unexplored areas
-        score = 1.0 - self.exploration_grid[grid_y, grid_x]
+        score = 1.0 - self.coverage.get(grid_y * self.grid_resolution + grid_x)
         return score
     
     def get_new_target(self, drone_id, current_pos):
         """Find a new target position for a drone"""
-        # Get least explored regions
-        flat_indices = np.argsort(self.exploration_grid.flatten())
-        least_explored = flat_indices[:20]  # Get top 20 least explored cells
-        
-        # Convert to 2D indices
-        candidates = []
-        for idx in least_explored:
-            y_idx = idx // self.grid_resolution
-            x_idx = idx % self.grid_resolution
+        return tuple(self.get_new_targets([drone_id], [current_pos])[0].tolist())
+    
+    def get_new_targets(self, drone_ids, current_positions=None):
+        """
+        Find new target positions for several drones at once
+        
+        Each drone gets the center of a random cell from the least explored
+        level of the frontier index, with all random draws made in one batch.
+        
+        Parameters:
+        -----------
+        drone_ids : array-like of int
+            Indices of the drones that need a new target
+        current_positions : array-like, optional
+            Positions of those drones (defaults to their current positions)
+        
+        Returns:
+        --------
+        np.ndarray
+            New targets, shape (len(drone_ids), 2)
+        """
+        drone_ids = np.asarray(drone_ids, dtype=int)
+        if current_positions is None:
+            current_positions = self.drone_positions[drone_ids]
+        current_positions = np.asarray(current_positions, dtype=float).reshape(-1, 2)
+        if len(drone_ids) == 0:
+            return np.empty((0, 2))
+        
+        cells = np.empty(0, dtype=np.intp)
+        if self.targeting == 'nearest':
+            cells = self.get_nearest_uncovered_cells(current_positions)
+        if cells.size == 0:
+            # Get a random least explored cell for every drone
+            cells = self.frontier.sample(len(drone_ids), self.rng)
+        if cells.size:
+            y_idx, x_idx = np.divmod(cells, self.grid_resolution)
             # Convert to actual coordinates
             x = (x_idx + 0.5) * self.grid_size / self.grid_resolution
             y = (y_idx + 0.5) * self.grid_size / self.grid_resolution
-            
-            # Check if inside search area
-            if self.is_point_inside_area([x, y]):
-                candidates.append((x, y))
+            return np.column_stack((x, y))
         
-        if candidates:
-            # Get random one from candidates
-            return random.choice(candidates)
-        else:
-            # Random position within search area if no good candidates
-            max_attempts = 50
-            attempts = 0
-            while attempts < max_attempts:
-                x = np.random.randint(self.boundary_padding, self.grid_size - self.boundary_padding)
-                y = np.random.randint(self.boundary_padding, self.grid_size - self.boundary_padding)
-                if self.is_point_inside_area([x, y]):
-                    return (x, y)
-                attempts += 1
-            
-            # If all attempts fail, return current position
-            return current_pos
-    
-    def update_grid(self):
-        """Update the exploration grid based on drone positions"""
-        for x, y in self.drone_positions:
-            # Define scan area radius in grid cells
-            scan_cell_radius = int(self.scan_radius * 5 / self.grid_size * self.grid_resolution)
-            
-            # Get center cell coordinates
-            grid_x = int(x / self.grid_size * self.grid_resolution)
-            grid_x = max(0, min(self.grid_resolution-1, grid_x))
-            grid_y = int(y / self.grid_size * self.grid_resolution)
-            grid_y = max(0, min(self.grid_resolution-1, grid_y))
+        # Random position within search area if no good candidates
+        max_attempts = 50
+        attempts = self.rng.integers(
+            self.boundary_padding,
+            self.grid_size - self.boundary_padding,
+            size=(len(drone_ids), max_attempts, 2)
+        ).astype(float)
+        inside = self.area_path.contains_points(attempts.reshape(-1, 2))
+        inside = inside.reshape(len(drone_ids), max_attempts)
+        
+        # First successful attempt per drone; if all attempts fail, keep current position
+        targets = current_positions.copy()
+        found = inside.any(axis=1)
+        first = np.argmax(inside, axis=1)
+        targets[found] = attempts[found, first[found]]
+        return targets
+    
+    def get_uncovered_tree(self, max_stale=0.25):
+        """
+        Get a KD-tree over the centers of uncovered cells inside the search area
+        
+        Coverage only grows, so a tree built earlier still holds every
+        uncovered cell plus some that have been covered since; queries skip
+        those (see get_nearest_uncovered_cells). The tree is rebuilt once the
+        covered cells exceed max_stale of its size, so it is shared across
+        steps and across the legs of fast_forward.
+        
+        Parameters:
+        -----------
+        max_stale : float
+            Fraction of covered cells at which the tree is rebuilt
+        
+        Returns:
+        --------
+        tuple
+            The cKDTree (None if every cell is covered) and the flat indices of its cells
+        """
+        if self._uncovered_tree is not None:
+            tree, cells = self._uncovered_tree
+            stale = self.covered_cells - self._uncovered_tree_covered
+            if stale <= max_stale * len(cells):
+                return self._uncovered_tree
+        
+        inside_cells = self.area_mask.cells()
+        values = self.coverage.get(inside_cells)
+        cells = inside_cells[values <= self.coverage_threshold]
+        tree = None
+        if cells.size:
+            y_idx, x_idx = np.divmod(cells, self.grid_resolution)
+            x = (x_idx + 0.5) * self.grid_size / self.grid_resolution
+            y = (y_idx + 0.5) * self.grid_size / self.grid_resolution
+            tree = cKDTree(np.column_stack((x, y)))
+        self._uncovered_tree = (tree, cells)
+        self._uncovered_tree_version = self.coverage_version
+        self._uncovered_tree_covered = self.covered_cells
+        return self._uncovered_tree
+    
+    def get_nearest_uncovered_cells(self, positions):
+        """
+        Find the nearest uncovered cell for each position
+        
+        Cells closer than the arrival radius would be reached immediately, so
+        the nearest cell beyond it is preferred.
+        
+        Parameters:
+        -----------
+        positions : np.ndarray
+            Grid positions, shape (n, 2)
+        
+        Returns:
+        --------
+        np.ndarray of int
+            Flat cell indices, one per position (empty if every cell is covered)
+        """
+        tree, cells = self.get_uncovered_tree()
+        if tree is None or len(positions) == 0:
+            return np.empty(0, dtype=np.intp)
+        
+        # Enough neighbours to step past every cell inside the arrival radius
+        cell_size = self.grid_size / self.grid_resolution
+        k = int(np.pi * (self.arrival_radius / cell_size + 1) ** 2) + 1
+        fresh = self._uncovered_tree_version == self.coverage_version
+        
+        result = np.empty(len(positions), dtype=np.intp)
+        pending = np.arange(len(positions))
+        while pending.size:
+            k = min(k, len(cells))
+            distances, neighbours = tree.query(positions[pending], k=k)
+            distances = distances.reshape(len(pending), k)
+            neighbours = neighbours.reshape(len(pending), k)
             
-            # Update cells within scan radius
-            for dx in range(-scan_cell_radius, scan_cell_radius + 1):
-                for dy in range(-scan_cell_radius, scan_cell_radius + 1):
-                    nx = grid_x + dx
-                    ny = grid_y + dy
-                    # Check if within grid bounds and within scan circle
-                    if (0 <= nx < self.grid_resolution and 0 <= ny < self.grid_resolution and
-                        dx*dx + dy*dy <= scan_cell_radius*scan_cell_radius):
-                        
-                        # Check if point is inside search area
-                        point_x = (nx + 0.5) * self.grid_size / self.grid_resolution
-                        point_y = (ny + 0.5) * self.grid_size / self.grid_resolution
-                        
-                        if self.is_point_inside_area([point_x, point_y]):
-                            # Apply diminishing effect based on distance
-                            dist = np.sqrt(dx*dx + dy*dy) / scan_cell_radius
-                            effect = 0.2 * max(0, 1 - dist)
-                            self.exploration_grid[ny, nx] = min(1.0, self.exploration_grid[ny, nx] + effect)
-    
-    def simulate_step(self):
-        """Simulate one step of the drone movement"""
-        # Update drone positions
-        for i in range(self.n_drones):
-            # Get or update target
-            if self.drone_targets[i] is None or np.random.random() < 0.01:
-                self.drone_targets[i] = self.get_new_target(i, self.drone_positions[i])
+            # Skip cells covered since the tree was built
+            if fresh:
+                uncovered = np.ones(neighbours.shape, dtype=bool)
+            else:
+                uncovered = self.coverage.get(cells[neighbours]) <= self.coverage_threshold
             
-            target_x, target_y = self.drone_targets[i]
-            current_x, current_y = self.drone_positions[i]
+            # First uncovered neighbour beyond the arrival radius, else the farthest uncovered one
+            beyond = uncovered & (distances >= self.arrival_radius)
+            last = k - 1 - np.argmax(uncovered[:, ::-1], axis=1)
+            choice = np.where(beyond.any(axis=1), np.argmax(beyond, axis=1), last)
+            # Rows without an uncovered cell beyond the radius may find one further out
+            done = beyond.any(axis=1) | (k == len(cells))
+            found = done & uncovered.any(axis=1)
+            result[pending[found]] = cells[neighbours[found, choice[found]]]
             
-            # Calculate direction to target
-            dx = target_x - current_x
-            dy = target_y - current_y
-            distance = np.sqrt(dx*dx + dy*dy)
+            if k == len(cells) and not found.all():
+                # Every cell of the tree is covered
+                self._uncovered_tree = None
+                return self.get_nearest_uncovered_cells(positions)
+            pending = pending[~done]
+            k *= 2
+        return result
+    
+    def get_scan_kernel(self, scan_cell_radius):
+        """
+        Get the footprint stamp for a scan radius (cached per radius)
+        
+        Parameters:
+        -----------
+        scan_cell_radius : int
+            Scan radius in grid cells
+        
+        Returns:
+        --------
+        tuple of np.ndarray
+            Row offsets, column offsets and the distance-falloff effect of
+            every cell in the scan circle that receives a non-zero effect
+        """
+        kernel = self._scan_kernels.get(scan_cell_radius)
+        if kernel is None:
+            # Offsets beyond the grid extent can never land on a cell, so the
+            # kernel is truncated there while keeping the falloff of the full radius
+            extent = min(scan_cell_radius, self.grid_resolution - 1)
+            dy, dx = np.mgrid[-extent:extent + 1, -extent:extent + 1]
+            dy = dy.ravel()
+            dx = dx.ravel()
+            in_circle = dx*dx + dy*dy <= scan_cell_radius*scan_cell_radius
+            dy = dy[in_circle]
+            dx = dx[in_circle]
             
-            if distance < 5:  # If close to target, get new target
-                self.drone_targets[i] = self.get_new_target(i, self.drone_positions[i])
+            if scan_cell_radius > 0:
+                # Apply diminishing effect based on distance
+                dist = np.sqrt(dx*dx + dy*dy) / scan_cell_radius
+                effect = 0.2 * np.maximum(0, 1 - dist)
             else:
-                # Normalize and scale
-                dx /= distance
-                dy /= distance
-                speed = 2 + np.random.random() * 2
-                self.drone_velocities[i] = [dx * speed, dy * speed]
+                effect = np.zeros(dx.shape)
             
-            # Apply velocity
-            vx, vy = self.drone_velocities[i]
-            new_x = current_x + vx
-            new_y = current_y + vy
-            
-            # Boundary check and ensure inside search area
-            if not self.is_point_inside_area([new_x, new_y]):
-                # Bounce off boundary
-                self.drone_velocities[i][0] *= -1
-                self.drone_velocities[i][1] *= -1
+            # Cells with no effect leave the grid unchanged
+            nonzero = effect > 0
+            kernel = (dy[nonzero], dx[nonzero], effect[nonzero])
+            self._scan_kernels[scan_cell_radius] = kernel
+        return kernel
+    
+    def get_scan_cell_radius(self):
+        """Scan radius in grid cells"""
+        return int(self.scan_radius * 5 / self.grid_size * self.grid_resolution)
+    
+    def get_cells(self, positions):
+        """Get the (column, row) cell of each grid position, clamped to the grid"""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        cells = (positions / self.grid_size * self.grid_resolution).astype(int)
+        return np.clip(cells, 0, self.grid_resolution - 1)
+    
+    def update_grid(self, previous_positions=None):
+        """
+        Update the exploration grid based on drone positions
+        
+        Parameters:
+        -----------
+        previous_positions : np.ndarray, optional
+            Drone positions before the last move. With swept_coverage, the
+            whole path from these to the current positions is stamped
+        """
+        # Define scan area radius in grid cells
+        scan_cell_radius = self.get_scan_cell_radius()
+        self.last_changes = (np.empty(0, dtype=np.intp), np.empty(0))
+        if self.n_drones == 0:
+            return
+        
+        if self.swept_coverage and previous_positions is not None:
+            self.stamp_segments(previous_positions, self.drone_positions)
+            return
+        
+        offsets_y, offsets_x, effects = self.get_scan_kernel(scan_cell_radius)
+        if effects.size == 0:
+            return
+        
+        # Get center cell coordinates for all drones
+        centers = self.get_cells(self.drone_positions)
+        
+        # Stamp the kernel around every drone, grouped by drone
+        flat_indices, cell_effects = stamp_footprints(
+            centers, offsets_y, offsets_x, effects, self.grid_resolution, self.kernel_backend
+        )
+        self.apply_footprints(flat_indices, cell_effects)
+    
+    def stamp_segments(self, starts, ends, durations=None):
+        """
+        Stamp the swept scan footprint (a capsule) of straight moves from starts to ends
+        
+        Each cell receives the distance falloff integrated over the time the
+        footprint spends over it. This matches stamping the footprint once
+        per unit of time along the move, so coverage doesn't depend on how
+        long the steps are.
+        
+        Parameters:
+        -----------
+        starts : np.ndarray
+            Grid positions at the start of each move, shape (n, 2)
+        ends : np.ndarray
+            Grid positions at the end of each move, shape (n, 2)
+        durations : float or np.ndarray, optional
+            Duration of each move (defaults to the time step)
+        """
+        scan_cell_radius = self.get_scan_cell_radius()
+        self.last_changes = (np.empty(0, dtype=np.intp), np.empty(0))
+        if scan_cell_radius == 0 or len(starts) == 0:
+            return
+        if durations is None:
+            durations = self.time_step
+        durations = np.broadcast_to(np.asarray(durations, dtype=float), (len(starts),))
+        
+        start_cells = self.get_cells(starts)
+        end_cells = self.get_cells(ends)
+        flat_indices, segment, along, across = capsule_cells(
+            start_cells, end_cells, scan_cell_radius, self.coverage.shape
+        )
+        length = np.sqrt(np.sum((end_cells - start_cells) ** 2, axis=1))[segment]
+        duration = durations[segment]
+        
+        # Moving drones spread their dwell time along the move; hovering ones stamp in place
+        moving = length > 0
+        falloff = np.where(
+            moving,
+            segment_falloff_integral(along, across, length, scan_cell_radius) / np.where(moving, length, 1),
+            np.maximum(0, 1 - across / scan_cell_radius)
+        )
+        cell_effects = 0.2 * duration * falloff
+        nonzero = cell_effects > 0
+        self.apply_footprints(flat_indices[nonzero], cell_effects[nonzero])
+    
+    def apply_footprints(self, flat_indices, cell_effects):
+        """
+        Add scan effects to the exploration grid and update the derived state
+        
+        Parameters:
+        -----------
+        flat_indices : np.ndarray of int
+            Flat cell indices, grouped by drone
+        cell_effects : np.ndarray
+            Effect for each entry of flat_indices
+        """
+        # Only cells inside the search area are updated
+        inside = self.area_mask.contains(flat_indices)
+        flat_indices = flat_indices[inside]
+        
+        # Repeated cells are applied in drone order, so clamping once
+        # afterwards matches clamping after every individual drone
+        with self.profiler.phase('accumulate'):
+            touched, old_values, new_values = self.coverage.accumulate(flat_indices, cell_effects[inside])
+        with self.profiler.phase('frontier'):
+            self.frontier.update(touched, new_values)
+        self.last_changes = (touched, new_values)
+        self.coverage_version += 1
+        
+        # Count cells crossing the coverage threshold
+        with self.profiler.phase('coverage_count'):
+            self.covered_cells += count_crossings(old_values, new_values, self.coverage_threshold, self.kernel_backend)
+    
+    def simulate_step(self, output='full'):
+        """
+        Simulate one step of the drone movement
+        
+        Parameters:
+        -----------
+        output : str
+            'full' returns copies of all state (see snapshot), 'view' returns
+            read-only views that stay valid until the next step, and 'delta'
+            returns only what changed during the step (see get_step_delta)
+        
+        Returns:
+        --------
+        dict
+            The step result
+        """
+        if output not in ('full', 'view', 'delta'):
+            raise ValueError(f"Unsupported output '{output}'. Choose from ['full', 'view', 'delta']")
+        
+        self.advance()
+        if output == 'delta':
+            return self.get_step_delta()
+        return self.snapshot(copy=output == 'full')
+    
+    def snapshot(self, copy=True, include_grid=True):
+        """
+        Get the full simulation state
+        
+        Parameters:
+        -----------
+        copy : bool
+            Copy all state; otherwise return read-only views of the positions
+            and grid (the grid is assembled anew for the tiled store) and the
+            recent paths as one (n_drones, length, 2) array
+        include_grid : bool
+            Include the dense exploration grid; leave it out for large tiled
+            grids, where it would take far more memory than the tiles
+        
+        Returns:
+        --------
+        dict
+            Drone positions and paths, the exploration grid (if included) and
+            the coverage
+        """
+        if copy:
+            state = {
+                'drone_positions': self.drone_positions.copy(),
+                'drone_paths': self.drone_paths,
+                'coverage_percent': self.get_coverage_percent()
+            }
+            if include_grid:
+                state['exploration_grid'] = self.coverage.to_array()
+            return state
+        
+        positions = self.drone_positions.view()
+        positions.flags.writeable = False
+        state = {
+            'drone_positions': positions,
+            'drone_paths': self.tracks.recent(),
+            'coverage_percent': self.get_coverage_percent()
+        }
+        if include_grid:
+            grid = self.coverage.to_array(copy=False).view()
+            grid.flags.writeable = False
+            state['exploration_grid'] = grid
+        return state
+    
+    def get_step_delta(self):
+        """
+        Get what changed during the last step
+        
+        Returns:
+        --------
+        dict
+            The step number, the flat indices and new values of the grid cells
+            updated during the step, new drone positions and targets (copies;
+            every drone moves each step) and the coverage
+        """
+        changed_cells, changed_values = self.last_changes
+        return {
+            'step': self.step_count,
+            'changed_cells': changed_cells,
+            'changed_values': changed_values,
+            'drone_positions': self.drone_positions.copy(),
+            'drone_targets': self.drone_targets.copy(),
+            'coverage_percent': self.get_coverage_percent()
+        }
+    
+    def advance(self):
+        """Advance the drones by one step without building a step result"""
+        positions = self.drone_positions
+        velocities = self.drone_velocities
+        targets = self.drone_targets
+        profiler = self.profiler
+        profiler.step = self.step_count
+        
+        with profiler.phase('step'):
+            with profiler.phase('targets'):
+                # Get or update targets (a 1% chance per unit of time)
+                retarget_chance = 1 - 0.99 ** self.time_step
+                needs_target = np.isnan(targets[:, 0]) | (self.rng.random(self.n_drones) < retarget_chance)
+                retarget_ids = np.flatnonzero(needs_target)
+                targets[retarget_ids] = self.get_new_targets(retarget_ids)
                 
-                # Update with reversed velocity
-                vx, vy = self.drone_velocities[i]
-                new_x = current_x + vx
-                new_y = current_y + vy
+                # Calculate direction to target
+                delta = targets - positions
+                distance = np.sqrt(delta[:, 0]*delta[:, 0] + delta[:, 1]*delta[:, 1])
                 
-                # If still outside, move back towards center
-                if not self.is_point_inside_area([new_x, new_y]):
-                    center_x = sum(p[0] for p in self.convert_polygon_to_grid(self.area_coords)) / len(self.area_coords)
-                    center_y = sum(p[1] for p in self.convert_polygon_to_grid(self.area_coords)) / len(self.area_coords)
-                    
-                    dx = center_x - current_x
-                    dy = center_y - current_y
-                    distance = np.sqrt(dx*dx + dy*dy)
-                    
-                    # Normalize and scale
-                    if distance > 0:
-                        dx /= distance
-                        dy /= distance
-                        speed = 2
-                        self.drone_velocities[i] = [dx * speed, dy * speed]
-                        vx, vy = self.drone_velocities[i]
-                        new_x = current_x + vx
-                        new_y = current_y + vy
+                # If close to target, get new target and keep the current velocity
+                arrived = distance < self.arrival_radius
+                arrived_ids = np.flatnonzero(arrived)
+                targets[arrived_ids] = self.get_new_targets(arrived_ids)
             
-            # Update position
-            self.drone_positions[i] = [new_x, new_y]
+            with profiler.phase('movement'):
+                # Normalize and scale, then apply velocity without overshooting the target on long steps
+                steering = ~arrived
+                speed = 2 + self.rng.random(np.count_nonzero(steering)) * 2
+                new_positions = steer_and_move(
+                    positions, velocities, delta, distance, steering, speed, self.time_step, self.kernel_backend
+                )
+            
+            with profiler.phase('boundary'):
+                # Boundary check against the signed distance field, exact near the edge
+                outside = np.flatnonzero(self.is_outside(new_positions))
+                if outside.size:
+                    current = positions[outside]
+                    velocities[outside] = self.get_boundary_velocities(
+                        current, velocities[outside], new_positions[outside], self.time_step
+                    )
+                    new_positions[outside] = current + velocities[outside] * self.time_step
+            
+            # Update positions in place
+            previous_positions = positions.copy()
+            positions[:] = new_positions
             
             # Store path
-            self.drone_paths[i].append((new_x, new_y))
-            if len(self.drone_paths[i]) > 50:  # Keep only last 50 positions
-                self.drone_paths[i].pop(0)
+            self.tracks.append(new_positions)
+            
+            # Update exploration grid
+            with profiler.phase('grid_update'):
+                self.update_grid(previous_positions)
         
-        # Update exploration grid
-        self.update_grid()
+        self.step_count += 1
+    
+    def fast_forward(self, max_steps):
+        """
+        Advance the simulation by max_steps with an event-driven engine
+        
+        Instead of moving every drone in fixed increments, each drone flies a
+        straight leg until its next event: arriving at its target, touching
+        the boundary, or a scheduled retarget (drawn from the same 1% per unit
+        of time rate as fixed stepping). Targets are kept across grazing
+        contacts, where the drone slides along the edge; a drone turned away
+        from its target flies on for the target's distance and then picks a
+        new one. The whole leg's swept footprint is rasterized when the leg
+        starts, and the engine jumps straight to the next event of any drone.
+        The coverage gained by a leg is spread linearly over its duration to
+        report a per-step curve. Paths in drone_paths are not recorded for the
+        skipped steps.
+        
+        Measured against fixed stepping with swept coverage (10 drones, 5 m
+        cells, 1000-2000 steps), this is about 8x faster with frontier
+        targeting and about 2x faster with nearest targeting, at comparable
+        coverage. The gain is a constant factor, not orders of magnitude.
+        
+        Parameters:
+        -----------
+        max_steps : int
+            Number of steps of time_step each to advance
+        
+        Returns:
+        --------
+        np.ndarray
+            Coverage percentage after each step, shape (max_steps,)
+        """
+        start_time = self.step_count * self.time_step
+        end_time = start_time + max_steps * self.time_step
+        retarget_rate = -np.log(0.99)
+        start_covered = self.covered_cells
+        
+        # Coverage gained per leg: (start time, end time, newly covered cells)
+        legs = []
+        retarget_times = start_time + self.rng.exponential(1 / retarget_rate, self.n_drones)
+        blocked = np.zeros(self.n_drones, dtype=bool)
+        events = [(start_time, i) for i in range(self.n_drones)]
+        heapq.heapify(events)
+        while events:
+            leg_start, i = heapq.heappop(events)
+            if leg_start >= end_time:
+                continue
+            position = self.drone_positions[i].copy()
+            target = self.drone_targets[i].copy()
+            delta = target - position
+            distance = np.sqrt(delta[0]*delta[0] + delta[1]*delta[1])
+            
+            # Keep the target across grazing contacts, as fixed stepping does
+            retarget = leg_start >= retarget_times[i]
+            if retarget or blocked[i] or np.isnan(target[0]) or distance < self.arrival_radius:
+                target = self.get_new_targets([i])[0]
+                delta = target - position
+                distance = np.sqrt(delta[0]*delta[0] + delta[1]*delta[1])
+            if retarget:
+                retarget_times[i] = leg_start + self.rng.exponential(1 / retarget_rate)
+            speed = 2 + self.rng.random() * 2
+            retarget_time = retarget_times[i]
+            
+            if distance > 0:
+                velocity = delta / distance * speed
+                arrival_time = leg_start + distance / speed
+            else:
+                # Already at the target: keep the current heading
+                velocity = self.drone_velocities[i].copy()
+                arrival_time = leg_start + self.time_step
+            leg_end = min(arrival_time, retarget_time, end_time)
+            
+            # Stop half a cell before the first boundary contact along the leg
+            blocked[i] = False
+            contact = self.get_leg_contact(position, velocity, leg_end - leg_start)
+            if contact is not None:
+                contact_time, blocked_position = contact
+                if contact_time >= self.time_step:
+                    leg_end = leg_start + contact_time
+                else:
+                    # Blocked right away: slide, reflect or step back inside
+                    velocity = self.get_boundary_velocities(
+                        position[None], velocity[None], blocked_position[None], self.time_step
+                    )[0]
+                    # A slide lasts until the drone is level with its target (where
+                    # fixed stepping would turn); a drone turned away from its target
+                    # flies as far as the target was and then picks a new one. Either
+                    # heading ends early if it meets the boundary again.
+                    progress = delta[0]*velocity[0] + delta[1]*velocity[1]
+                    speed_squared = velocity[0]*velocity[0] + velocity[1]*velocity[1]
+                    blocked[i] = progress <= 0
+                    if blocked[i]:
+                        duration = distance / np.sqrt(speed_squared) if speed_squared > 0 else 0
+                    else:
+                        duration = progress / speed_squared
+                    duration = max(duration, self.time_step)
+                    duration = min(duration, max(retarget_time - leg_start, self.time_step))
+                    contact = self.get_leg_contact(position, velocity, duration)
+                    if contact is not None:
+                        duration = max(contact[0], self.time_step)
+                    leg_end = min(leg_start + duration, end_time)
+            
+            # Rasterize the whole leg and move on to its end
+            end_position = position + velocity * (leg_end - leg_start)
+            covered_before = self.covered_cells
+            self.stamp_segments(position[None], end_position[None], leg_end - leg_start)
+            legs.append((leg_start, leg_end, self.covered_cells - covered_before))
+            
+            self.drone_positions[i] = end_position
+            self.drone_velocities[i] = velocity
+            self.drone_targets[i] = target
+            heapq.heappush(events, (leg_end, i))
+        
+        self.step_count += max_steps
+        
+        # Piecewise-linear coverage curve from the per-leg ramps
+        step_times = start_time + np.arange(1, max_steps + 1) * self.time_step
+        covered = np.full(max_steps, float(start_covered))
+        if legs:
+            leg_starts, leg_ends, gains = (np.array(column, dtype=float) for column in zip(*legs))
+            durations = np.maximum(leg_ends - leg_starts, 1e-12)
+            slopes = gains / durations
+            breakpoints = np.concatenate((leg_starts, leg_ends))
+            slope_changes = np.concatenate((slopes, -slopes))
+            order = np.argsort(breakpoints, kind='stable')
+            breakpoints = breakpoints[order]
+            slope = np.cumsum(slope_changes[order])
+            # Integrate the slope between consecutive breakpoints
+            values = np.concatenate(([0.0], np.cumsum(slope[:-1] * np.diff(breakpoints))))
+            covered += np.interp(step_times, breakpoints, values, left=0.0, right=values[-1])
         
-        # Calculate coverage
-        covered_cells = np.sum(self.exploration_grid > 0.2)  # Threshold for "covered"
         total_explorable_cells = self.get_explorable_cells_count()
-        coverage_percent = (covered_cells / total_explorable_cells) * 100 if total_explorable_cells > 0 else 0
+        if total_explorable_cells == 0:
+            return np.zeros(max_steps)
+        return covered / total_explorable_cells * 100
+    
+    def get_leg_contact(self, position, velocity, duration):
+        """
+        Find where a straight move first leaves the search area
         
-        return {
-            'drone_positions': self.drone_positions.copy(),
-            'drone_paths': [path.copy() for path in self.drone_paths],
-            'exploration_grid': self.exploration_grid.copy(),
-            'coverage_percent': coverage_percent
-        }
+        The move is sampled every half cell.
+        
+        Parameters:
+        -----------
+        position : np.ndarray
+            Start grid position, shape (2,)
+        velocity : np.ndarray
+            Velocity of the move, shape (2,)
+        duration : float
+            Duration of the move
+        
+        Returns:
+        --------
+        tuple or None
+            Time after the start at which to stop, half a cell before the
+            first sample outside the area, and that sample's position; None
+            if the move stays inside
+        """
+        cell_size = self.grid_size / self.grid_resolution
+        speed = np.sqrt(velocity[0]*velocity[0] + velocity[1]*velocity[1])
+        if speed == 0:
+            return None
+        length = speed * duration
+        samples = np.arange(1, int(2 * length / cell_size) + 2) * (cell_size / 2)
+        samples = np.minimum(samples, length)
+        points = position + np.outer(samples / speed, velocity)
+        outside = np.flatnonzero(self.is_outside(points))
+        if not outside.size:
+            return None
+        return max(samples[outside[0]] - cell_size / 2, 0) / speed, points[outside[0]]
+    
+    def get_boundary_velocities(self, positions, velocities, blocked_positions, duration):
+        """
+        Choose new velocities for drones whose move would leave the search area
+        
+        Grazing contacts slide along the edge and head-on contacts reflect off
+        it. If neither keeps the drone inside, it steps straight back inside.
+        
+        Parameters:
+        -----------
+        positions : np.ndarray
+            Current grid positions, shape (n, 2)
+        velocities : np.ndarray
+            Velocities that lead outside, shape (n, 2)
+        blocked_positions : np.ndarray
+            Positions outside the area that the velocities lead to, shape (n, 2)
+        duration : float
+            Duration of the move
+        
+        Returns:
+        --------
+        np.ndarray
+            New velocities, shape (n, 2)
+        """
+        normals = self.get_boundary_normals(blocked_positions)
+        outward_speed = np.maximum(np.sum(velocities * normals, axis=1), 0)[:, None]
+        
+        # Grazing contacts slide along the edge, head-on contacts reflect off it
+        sliding = velocities - outward_speed * normals
+        reflected = velocities - 2 * outward_speed * normals
+        speed = np.sqrt(np.sum(velocities * velocities, axis=1))
+        slide_speed = np.sqrt(np.sum(sliding * sliding, axis=1))
+        prefer_slide = (slide_speed >= 0.5 * speed)[:, None]
+        
+        # If neither keeps the drone inside, step straight back inside
+        inward = -self.get_boundary_normals(positions) * 2
+        options = np.stack((
+            np.where(prefer_slide, sliding, reflected),
+            np.where(prefer_slide, reflected, sliding),
+            inward
+        ))
+        choice = np.full(len(positions), len(options) - 1)
+        undecided = np.ones(len(positions), dtype=bool)
+        for k in range(len(options) - 1):
+            fits = undecided & ~self.is_outside(positions + options[k] * duration)
+            choice[fits] = k
+            undecided &= ~fits
+        return options[choice, np.arange(len(positions))]
+    
+    def get_profile_stats(self):
+        """Get the per-phase timing statistics recorded so far (requires profile=True)"""
+        return self.profiler.stats()
+    
+    def run_until(self, coverage=100.0, max_steps=10000):
+        """
+        Advance the simulation until a coverage target is reached
+        
+        Parameters:
+        -----------
+        coverage : float
+            Coverage percentage at which to stop
+        max_steps : int
+            Maximum number of steps to run
+        
+        Returns:
+        --------
+        int
+            Number of steps taken
+        """
+        for step in range(max_steps):
+            if self.get_coverage_percent() >= coverage:
+                return step
+            self.advance()
+        return max_steps
+    
+    def get_coverage_percent(self):
+        """Percentage of explorable cells above the coverage threshold"""
+        # Calculate coverage
+        total_explorable_cells = self.get_explorable_cells_count()
+        return (self.covered_cells / total_explorable_cells) * 100 if total_explorable_cells > 0 else 0
     
     def get_explorable_cells_count(self):
         """Count the number of grid cells that are inside the search area"""
-        count = 0
-        for y in range(self.grid_resolution):
-            for x in range(self.grid_resolution):
-                # Convert to grid coordinates
-                point_x = (x + 0.5) * self.grid_size / self.grid_resolution
-                point_y = (y + 0.5) * self.grid_size / self.grid_resolution
-                
-                if self.is_point_inside_area([point_x, point_y]):
-                    count += 1
-        return count
+        return self._explorable_cells
+    
+    def get_coverage_bounds(self):
+        """
+        Get the real-world extent of the coverage grid for map overlays
+        
+        Returns:
+        --------
+        tuple
+            ((south, west), (north, east)) in (lat, lon) order, as used by
+            ipyleaflet; grid row 0 lies at the south edge
+        """
+        corners = self.grid_to_coords([[0, 0], [self.grid_size, 0], [0, self.grid_size],
+                                       [self.grid_size, self.grid_size]])
+        west, south = corners.min(axis=0)
+        east, north = corners.max(axis=0)
+        return ((float(south), float(west)), (float(north), float(east)))
+    
+    def get_coverage_overlay(self, max_size=1024):
+        """
+        Get the coverage as an image aligned with longitude and latitude, for map overlays
+        
+        Web maps stretch an image overlay linearly in longitude and Web
+        Mercator y between its bounds. In a projected frame the grid is
+        rotated against those axes (meridian convergence), so it is
+        resampled (nearest cell) onto such a raster; pixels beyond the grid
+        read 0. In the degree frame the grid already lines up.
+        
+        Parameters:
+        -----------
+        max_size : int
+            Largest side of the image in pixels (see get_coverage_preview)
+        
+        Returns:
+        --------
+        tuple
+            Coverage image indexed (row, column) with row 0 at the south
+            edge, and its ((south, west), (north, east)) bounds
+        """
+        step = max(1, -(-self.grid_resolution // max_size))
+        preview = self.coverage.to_array(step=step)
+        bounds = self.get_coverage_bounds()
+        if self.crs is None:
+            return preview, bounds
+        
+        cells = self._get_overlay_cells(step, bounds)
+        image = np.zeros(cells.shape, dtype=preview.dtype)
+        inside = cells >= 0
+        image[inside] = preview.reshape(-1)[cells[inside]]
+        return image, bounds
+    
+    def _get_overlay_cells(self, step, bounds, lattice=33):
+        """Flat cell of the step-th cell preview under each overlay pixel (-1 beyond the grid), cached"""
+        if self._overlay_cells is not None and self._overlay_cells[0] == step:
+            return self._overlay_cells[1]
+        rows = columns = -(-self.grid_resolution // step)
+        (south, west), (north, east) = bounds
+        
+        # Project a coarse lattice of nodes exactly and interpolate between them;
+        # the projection is smooth over a search area
+        mercator = np.log(np.tan(np.pi / 4 + np.radians([south, north]) / 2))
+        lat = np.degrees(2 * np.arctan(np.exp(np.linspace(mercator[0], mercator[1], lattice))) - np.pi / 2)
+        lon = np.linspace(west, east, lattice)
+        nodes = self.coords_to_grid(np.stack(np.meshgrid(lon, lat), axis=-1))
+        
+        # Pixel centers in lattice units, interpolated along latitude then longitude
+        def weights(count):
+            position = (np.arange(count) + 0.5) / count * (lattice - 1)
+            first = np.minimum(position.astype(np.intp), lattice - 2)
+            return first, (position - first)[:, None, None]
+        first_row, row_weight = weights(rows)
+        nodes = nodes[first_row] * (1 - row_weight) + nodes[first_row + 1] * row_weight
+        first_column, column_weight = weights(columns)
+        column_weight = column_weight.reshape(1, -1, 1)
+        points = nodes[:, first_column] * (1 - column_weight) + nodes[:, first_column + 1] * column_weight
+        
+        # Preview cell containing each pixel center
+        preview_cell = self.grid_size / self.grid_resolution * step
+        x = np.floor(points[..., 0] / preview_cell).astype(np.intp)
+        y = np.floor(points[..., 1] / preview_cell).astype(np.intp)
+        inside = (x >= 0) & (x < columns) & (y >= 0) & (y < rows)
+        self._overlay_cells = (step, np.where(inside, y * columns + x, -1))
+        return self._overlay_cells[1]
     
     def get_real_world_paths(self):
         """Convert grid paths to real-world coordinates"""
-        real_paths = []
-        for path in self.drone_paths:
-            real_path = [self.convert_grid_to_coords(point) for point in path]
-            real_paths.append(real_path)
-        return real_paths
+        return self.grid_to_coords(self.tracks.recent()).tolist()
     
     def get_real_world_positions(self):
         """Convert grid positions to real-world coordinates"""
-        return [self.convert_grid_to_coords(pos) for pos in self.drone_positions]
\ No newline at end of file
+        return self.grid_to_coords(self.drone_positions).tolist()
@@ -0,0 +1,101 @@
+# src/utils/ensemble_utils.py
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.search_algorithm_v1 import DroneSearchSimulation
+
+def run_replica(area_coords, n_drones, max_steps, seed, simulation_kwargs=None):
+    """
+    Run one seeded replica of a search simulation without any plotting
+    
+    Returns:
+    --------
+    np.ndarray
+        Coverage percentage after every step, shape (max_steps,)
+    """
+    simulation = DroneSearchSimulation(area_coords, n_drones=n_drones, seed=seed, **(simulation_kwargs or {}))
+    coverage = np.empty(max_steps, dtype=np.float32)
+    for step in range(max_steps):
+        simulation.advance()
+        coverage[step] = simulation.get_coverage_percent()
+    return coverage
+
+def _run_replica_task(task):
+    """Unpack a task tuple for executor.map"""
+    return run_replica(*task)
+
+def time_to_coverage(coverage, target):
+    """
+    Get the first step (1-based) at which each replica reaches a coverage target
+    
+    Parameters:
+    -----------
+    coverage : np.ndarray
+        Coverage curves, shape (n_replicas, n_steps)
+    target : float
+        Coverage percentage to reach
+    
+    Returns:
+    --------
+    np.ndarray
+        Step counts, NaN for replicas that never reach the target
+    """
+    reached = coverage >= target
+    steps = (np.argmax(reached, axis=1) + 1).astype(float)
+    steps[~reached.any(axis=1)] = np.nan
+    return steps
+
+def run_ensemble(area_coords, n_replicas, max_steps, n_drones=5, seed=None, max_workers=None,
+                 coverage_targets=(50, 90), percentiles=(5, 25, 50, 75, 95), simulation_kwargs=None):
+    """
+    Run seeded replicas of one simulation configuration across a process pool
+    
+    Parameters:
+    -----------
+    area_coords : list of (lon, lat) tuples
+        The coordinates of the polygon defining the search area
+    n_replicas : int
+        Number of replicas to run
+    max_steps : int
+        Number of steps per replica
+    n_drones : int
+        Number of drones per replica
+    seed : int, optional
+        Root seed; replica seeds are spawned from it so the ensemble is reproducible
+    max_workers : int, optional
+        Number of worker processes (defaults to the CPU count). Use 1 to run in-process
+    coverage_targets : sequence of float
+        Coverage percentages for which to report the time to reach them
+    percentiles : sequence of float
+        Percentiles of coverage to report at every step
+    simulation_kwargs : dict, optional
+        Extra keyword arguments for DroneSearchSimulation
+    
+    Returns:
+    --------
+    dict
+        A dictionary containing the ensemble statistics
+    """
+    seed_sequences = np.random.SeedSequence(seed).spawn(n_replicas)
+    seeds = [int(s.generate_state(1)[0]) for s in seed_sequences]
+    tasks = [(area_coords, n_drones, max_steps, s, simulation_kwargs) for s in seeds]
+    
+    if max_workers == 1:
+        curves = [_run_replica_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Batch tasks so that short replicas don't pay one round-trip each
+            workers = max_workers or os.cpu_count() or 1
+            chunksize = max(1, n_replicas // (4 * workers))
+            curves = list(executor.map(_run_replica_task, tasks, chunksize=chunksize))
+    
+    coverage = np.stack(curves)
+    return {
+        'steps': np.arange(1, max_steps + 1),
+        'coverage': coverage,
+        'mean': coverage.mean(axis=0),
+        'percentiles': {p: np.percentile(coverage, p, axis=0) for p in percentiles},
+        'time_to_coverage': {t: time_to_coverage(coverage, t) for t in coverage_targets},
+        'seeds': np.array(seeds, dtype=np.uint32)
+    }
@@ -0,0 +1,931 @@
+# src/utils/grid_utils.py
+
+import numpy as np
+from src.utils.kernel_utils import accumulate_clamped_numba
+
+class AreaMask:
+    def __init__(self, polygon, shape, cell_size):
+        """
+        Cells of a grid whose centers lie inside a polygon, stored as runs along rows
+
+        The polygon is rasterized by scanlines through the rows of cell
+        centers (even-odd rule), so memory and setup time grow with the
+        number of rows and edges rather than with the number of cells.
+
+        Parameters:
+        -----------
+        polygon : np.ndarray
+            Polygon vertices in grid units, shape (n, 2); the last edge closes it
+        shape : tuple of int
+            Grid shape (rows, columns)
+        cell_size : float
+            Cell side length in grid units
+        """
+        self.shape = tuple(shape)
+        rows, columns = self.shape
+        vertices = np.asarray(polygon, dtype=float)
+        x0, y0 = vertices[:, 0], vertices[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+        # Rows whose center line crosses each edge, taking low <= y < high so
+        # that a line through a vertex counts it once
+        low = np.clip(np.ceil(np.minimum(y0, y1) / cell_size - 0.5), 0, rows).astype(np.intp)
+        high = np.clip(np.ceil(np.maximum(y0, y1) / cell_size - 0.5), 0, rows).astype(np.intp)
+        counts = high - low
+        edges = np.repeat(np.arange(len(vertices)), counts)
+        crossing_rows = low[edges] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        y = (crossing_rows + 0.5) * cell_size
+        x = x0[edges] + (y - y0[edges]) * (x1 - x0)[edges] / (y1 - y0)[edges]
+
+        # Consecutive crossings along a row bound the runs of inside cells
+        order = np.lexsort((x, crossing_rows))
+        crossing_rows = crossing_rows[order][0::2]
+        x = x[order]
+        first = np.clip(np.floor(x[0::2] / cell_size - 0.5) + 1, 0, columns).astype(np.intp)
+        stop = np.clip(np.ceil(x[1::2] / cell_size - 0.5), 0, columns).astype(np.intp)
+        keep = stop > first
+
+        # Flat index of the first cell of every run and of the cell after it
+        starts = crossing_rows[keep] * columns + first[keep]
+        ends = crossing_rows[keep] * columns + stop[keep]
+
+        # No cell center inside the polygon
+        if starts.size == 0:
+            self.starts, self.ends, self.count = starts, ends, 0
+            return
+
+        # Merge runs that touch within a row, so runs never share a border cell
+        touching = (starts[1:] == ends[:-1]) & (ends[:-1] % columns != 0)
+        self.starts = starts[np.concatenate(([True], ~touching))]
+        self.ends = ends[np.concatenate((~touching, [True]))]
+        lengths = self.ends - self.starts
+        self.count = int(lengths.sum())
+
+    def __len__(self):
+        """Number of cells inside the area"""
+        return self.count
+
+    @property
+    def nbytes(self):
+        """Memory used by the runs"""
+        return self.starts.nbytes + self.ends.nbytes
+
+    def contains(self, cells):
+        """Test which flat cell indices lie inside the area"""
+        cells = np.asarray(cells, dtype=np.intp)
+        if self.starts.size == 0:
+            return np.zeros(cells.shape, dtype=bool)
+        runs = np.searchsorted(self.starts, cells, side='right') - 1
+        return (runs >= 0) & (cells < self.ends[np.maximum(runs, 0)])
+
+    def cells(self):
+        """Flat indices of all inside cells, in order (memory grows with the area)"""
+        lengths = self.ends - self.starts
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(self.starts - offsets, lengths) + np.arange(self.count)
+
+    def block(self, row_start, row_stop, column_start, column_stop, step=1):
+        """
+        Get the mask of a window of the grid as a dense array
+
+        Parameters:
+        -----------
+        row_start, row_stop, column_start, column_stop : int
+            Window bounds, stops exclusive
+        step : int
+            Keep every step-th row and column of the window
+
+        Returns:
+        --------
+        np.ndarray of bool
+            True for inside cells, shape (rows, columns) of the window
+        """
+        columns = self.shape[1]
+        rows = np.arange(row_start, row_stop, step)
+        width = column_stop - column_start
+
+        # Runs that overlap each row of the window
+        first = np.searchsorted(self.ends, rows * columns + column_start, side='right')
+        stop = np.searchsorted(self.starts, rows * columns + column_stop, side='left')
+        counts = np.maximum(stop - first, 0)
+        run_rows = np.repeat(np.arange(len(rows)), counts)
+        runs = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        row_origins = rows[run_rows] * columns + column_start
+        run_starts = np.clip(self.starts[runs] - row_origins, 0, width)
+        run_ends = np.clip(self.ends[runs] - row_origins, 0, width)
+
+        # Mark run boundaries (runs never share a border) and integrate along each row
+        changes = np.zeros((len(rows), width + 1), dtype=np.int8)
+        changes[run_rows, run_starts] = 1
+        changes[run_rows, run_ends] = -1
+        mask = np.cumsum(changes[:, :width], axis=1, dtype=np.int8) > 0
+        return mask[:, ::step]
+
+    def to_array(self, step=1):
+        """Get the mask of the whole grid as a dense (row, column) array"""
+        return self.block(0, self.shape[0], 0, self.shape[1], step)
+
+    def count_tiles(self, tile_size):
+        """Count the inside cells of every tile of a tiled layout (tiles in row-major order)"""
+        rows, columns = self.shape
+        tiles_x = -(-columns // tile_size)
+        n_tiles = -(-rows // tile_size) * tiles_x
+        run_rows, first = np.divmod(self.starts, columns)
+        stop = self.ends - run_rows * columns
+
+        # Split every run at tile borders
+        first_tile = first // tile_size
+        counts = (stop - 1) // tile_size - first_tile + 1
+        pieces = np.repeat(np.arange(len(first)), counts)
+        tile_x = first_tile[pieces] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        overlap = (np.minimum(stop[pieces], (tile_x + 1) * tile_size)
+                   - np.maximum(first[pieces], tile_x * tile_size))
+        tiles = run_rows[pieces] // tile_size * tiles_x + tile_x
+        return np.bincount(tiles, weights=overlap, minlength=n_tiles).astype(np.int64)
+
+class TiledArray:
+    def __init__(self, shape, tile_size=64, dtype=np.float64, fill_value=0):
+        """
+        A 2D array stored in fixed-size tiles allocated on first write
+
+        Cells of tiles that were never written read as fill_value.
+
+        Parameters:
+        -----------
+        shape : tuple of int
+            Array shape (rows, columns)
+        tile_size : int
+            Side length of a tile in cells
+        dtype : str or np.dtype
+            Element type
+        fill_value : scalar
+            Value of unwritten cells
+        """
+        self.shape = tuple(shape)
+        self.tile_size = tile_size
+        self.fill_value = fill_value
+        self.tiles_y = -(-self.shape[0] // tile_size)
+        self.tiles_x = -(-self.shape[1] // tile_size)
+
+        # Slot of every tile in the pool, -1 while the tile is unallocated
+        self.tile_slots = np.full(self.tiles_y * self.tiles_x, -1, dtype=np.intp)
+        self.pool = np.full((4, tile_size * tile_size), fill_value, dtype=dtype)
+        self.allocated_tiles = 0
+
+    @property
+    def nbytes(self):
+        """Memory used by the allocated tiles and the tile table"""
+        return self.pool[:self.allocated_tiles].nbytes + self.tile_slots.nbytes
+
+    def locate(self, cells):
+        """Split flat cell indices into tile ids and offsets within the tile"""
+        cells = np.asarray(cells, dtype=np.intp)
+        y, x = np.divmod(cells, self.shape[1])
+        tiles = (y // self.tile_size) * self.tiles_x + x // self.tile_size
+        offsets = (y % self.tile_size) * self.tile_size + x % self.tile_size
+        return tiles, offsets
+
+    def allocate(self, tiles):
+        """Allocate pool slots for tiles that don't have one yet"""
+        tiles = np.asarray(tiles, dtype=np.intp)
+        missing = np.unique(tiles[self.tile_slots[tiles] < 0])
+        if missing.size == 0:
+            return
+        needed = self.allocated_tiles + missing.size
+        if needed > len(self.pool):
+            # Grow geometrically so allocation stays amortized O(1) per tile
+            capacity = max(needed, 2 * len(self.pool))
+            pool = np.full((capacity, self.pool.shape[1]), self.fill_value, dtype=self.pool.dtype)
+            pool[:self.allocated_tiles] = self.pool[:self.allocated_tiles]
+            self.pool = pool
+        self.tile_slots[missing] = np.arange(self.allocated_tiles, needed)
+        self.allocated_tiles = needed
+
+    def get(self, cells):
+        """Get the values of flat cell indices"""
+        tiles, offsets = self.locate(cells)
+        slots = self.tile_slots[tiles]
+        values = np.full(slots.shape, self.fill_value, dtype=self.pool.dtype)
+        allocated = slots >= 0
+        values[allocated] = self.pool[slots[allocated], offsets[allocated]]
+        return values
+
+    def set(self, cells, values):
+        """Set the values of flat cell indices, allocating their tiles"""
+        tiles, offsets = self.locate(cells)
+        self.allocate(tiles)
+        self.pool[self.tile_slots[tiles], offsets] = values
+
+    def get_tile(self, tile):
+        """
+        Get the cells of a tile that lie within the array
+
+        Returns:
+        --------
+        tuple
+            Row and column of the tile's first cell and its values as a 2D
+            array, a view into the pool when the tile is allocated
+        """
+        tile_y, tile_x = divmod(int(tile), self.tiles_x)
+        y0, x0 = tile_y * self.tile_size, tile_x * self.tile_size
+        height = min(self.tile_size, self.shape[0] - y0)
+        width = min(self.tile_size, self.shape[1] - x0)
+        slot = self.tile_slots[tile]
+        if slot < 0:
+            return y0, x0, np.full((height, width), self.fill_value, dtype=self.pool.dtype)
+        return y0, x0, self.pool[slot].reshape(self.tile_size, self.tile_size)[:height, :width]
+
+class FrontierIndex:
+    def __init__(self, area, n_levels=20, tile_size=64):
+        """
+        Index of the least explored cells of a search area
+
+        Cells are bucketed by exploration level. Levels live in tiles that
+        are allocated when a cell in them is first updated or drawn, so
+        untouched cells cost no memory and sit at level 0. Exploration values
+        only ever grow, so while a level is the lowest non-empty one cells
+        can leave it but never enter it. The index keeps per-tile counts of
+        that level's cells, recounted only when the lowest level changes,
+        and draws a tile in proportion to its count and then a cell within
+        it, so sampling is uniform without scanning the grid. Updates cost
+        O(changed cells) and each drawn cell O(tiles + tile size).
+
+        Parameters:
+        -----------
+        area : AreaMask
+            Cells that belong to the search area
+        n_levels : int
+            Number of exploration levels used to bucket cells
+        tile_size : int
+            Side length of a level tile in cells
+        """
+        self.area = area
+        self.n_levels = n_levels
+        # Cells outside the search area get a sentinel level that is never counted
+        self.levels = TiledArray(area.shape, tile_size, np.uint8, 0)
+        self.inside_counts = area.count_tiles(tile_size)
+        self.counts = np.zeros(n_levels, dtype=np.int64)
+        self.counts[0] = len(area)
+
+        # Cells of each tile at the lowest level, as of the last query
+        self._tile_level = 0
+        self._tile_counts = self.inside_counts.copy()
+
+    def get_levels(self, values):
+        """Convert exploration values in [0, 1] to levels"""
+        levels = np.asarray(values, dtype=float) * self.n_levels
+        return np.minimum(levels, self.n_levels - 1).astype(np.uint8)
+
+    def __len__(self):
+        """Number of indexed (inside) cells"""
+        return int(self.counts.sum())
+
+    @property
+    def nbytes(self):
+        """Memory used by the level tiles and the per-tile counts"""
+        return self.levels.nbytes + self.inside_counts.nbytes + self._tile_counts.nbytes
+
+    def allocate(self, tiles):
+        """Allocate level tiles, marking their outside cells with the sentinel level"""
+        levels = self.levels
+        unallocated = levels.tile_slots[tiles] < 0
+        if not unallocated.any():
+            return
+        missing = np.unique(tiles[unallocated])
+        levels.allocate(missing)
+        for tile in missing:
+            y0, x0, block = levels.get_tile(tile)
+            height, width = block.shape
+            block[~self.area.block(y0, y0 + height, x0, x0 + width)] = self.n_levels
+
+    def update(self, cells, values):
+        """
+        Move cells to the levels of their new exploration values
+
+        Parameters:
+        -----------
+        cells : np.ndarray of int
+            Unique flat indices of cells inside the search area
+        values : np.ndarray
+            New exploration values of those cells
+        """
+        levels = self.levels
+        tiles, offsets = levels.locate(cells)
+        self.allocate(tiles)
+        slots = levels.tile_slots[tiles]
+        old_levels = levels.pool[slots, offsets]
+        new_levels = self.get_levels(values)
+        self.counts -= np.bincount(old_levels, minlength=self.n_levels)[:self.n_levels]
+        self.counts += np.bincount(new_levels, minlength=self.n_levels)[:self.n_levels]
+
+        # Cells that leave the counted level
+        leaving = (old_levels == self._tile_level) & (new_levels != self._tile_level)
+        np.subtract.at(self._tile_counts, tiles[leaving], 1)
+        levels.pool[slots, offsets] = new_levels
+
+    def lowest_level(self):
+        """Get the lowest non-empty level, or None if the index is empty"""
+        nonempty = np.flatnonzero(self.counts)
+        return int(nonempty[0]) if nonempty.size else None
+
+    def sample(self, count, rng):
+        """
+        Draw cells uniformly from the lowest non-empty level
+
+        Parameters:
+        -----------
+        count : int
+            Number of cells to draw (with replacement)
+        rng : numpy.random.Generator
+            Source of randomness
+
+        Returns:
+        --------
+        np.ndarray of int
+            Flat cell indices (empty if the index holds no cells)
+        """
+        level = self.lowest_level()
+        if level is None or count == 0:
+            return np.empty(0, dtype=np.intp)
+
+        # Recount the tiles for a new lowest level; untouched tiles only hold level 0
+        if level != self._tile_level:
+            levels = self.levels
+            allocated = np.flatnonzero(levels.tile_slots >= 0)
+            self._tile_counts = self.inside_counts.copy() if level == 0 else np.zeros_like(self.inside_counts)
+            pool = levels.pool[levels.tile_slots[allocated]]
+            self._tile_counts[allocated] = np.count_nonzero(pool == level, axis=1)
+            self._tile_level = level
+
+        # Rank of each drawn cell among the level's cells, in tile order
+        weights = self._tile_counts
+        cumulative = np.cumsum(weights)
+        ranks = rng.integers(cumulative[-1], size=count)
+        tiles = np.searchsorted(cumulative, ranks, side='right')
+        ranks -= cumulative[tiles] - weights[tiles]
+
+        # Resolve the ranks within each drawn tile
+        cells = np.empty(count, dtype=np.intp)
+        columns = self.area.shape[1]
+        drawn_tiles = np.unique(tiles)
+        self.allocate(drawn_tiles)
+        for tile in drawn_tiles:
+            y0, x0, levels = self.levels.get_tile(tile)
+            local_y, local_x = np.nonzero(levels == level)
+            drawn = np.flatnonzero(tiles == tile)
+            cells[drawn] = (y0 + local_y[ranks[drawn]]) * columns + x0 + local_x[ranks[drawn]]
+        return cells
+
+# Stored value that represents full coverage (1.0) for each supported dtype.
+# Integer grids use fixed point whose steps put the 0.2 threshold on a whole
+# number (50 for uint8, 13000 for uint16)
+COVERAGE_SCALES = {
+    'float64': 1.0,
+    'float32': 1.0,
+    'uint16': 65000,
+    'uint8': 250
+}
+
+def get_coverage_scale(dtype):
+    """Get the stored value of full coverage for a coverage dtype"""
+    name = np.dtype(dtype).name
+    if name not in COVERAGE_SCALES:
+        raise ValueError(f"Unsupported coverage dtype '{name}'. Choose from {list(COVERAGE_SCALES.keys())}")
+    return COVERAGE_SCALES[name]
+
+def accumulate_clamped(flat, indices, effects, limit, backend='numpy'):
+    """
+    Add effects to a flat buffer in order and clamp the touched entries at a limit
+
+    Float buffers use np.add.at, which applies repeated indices in order, so
+    clamping once afterwards matches clamping after every addition. Integer
+    buffers sum the effects of each index first and then saturate, which is
+    exact because integer addition doesn't depend on order.
+
+    Parameters:
+    -----------
+    flat : np.ndarray
+        One-dimensional buffer, modified in place
+    indices : np.ndarray of int
+        Buffer indices, possibly repeated
+    effects : np.ndarray
+        Non-negative effect for each entry of indices, in buffer units
+    limit : float
+        Value at which entries saturate
+    backend : str
+        'numpy' or 'numba' (see kernel_utils.resolve_kernel_backend)
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        Unique touched indices, the position of their first occurrence in
+        indices, and their values before and after the update
+    """
+    if backend == 'numba':
+        return accumulate_clamped_numba(flat, indices, effects, limit)
+    touched, first, inverse = np.unique(indices, return_index=True, return_inverse=True)
+    old_values = flat[touched]
+    if np.issubdtype(flat.dtype, np.integer):
+        sums = np.bincount(inverse.reshape(-1), weights=effects, minlength=len(touched))
+        new_values = np.minimum(limit, old_values + sums).astype(flat.dtype)
+    else:
+        np.add.at(flat, indices, effects)
+        new_values = np.minimum(flat.dtype.type(limit), flat[touched])
+    flat[touched] = new_values
+    return touched, first, old_values, new_values
+
+class CoverageGrid:
+    def __init__(self, shape, dtype=np.float64, backend='numpy'):
+        """
+        Base class for coverage stores holding values in [0, 1]
+
+        Parameters:
+        -----------
+        shape : tuple of int
+            Grid shape (rows, columns)
+        dtype : str or np.dtype
+            Storage type: 'float64', 'float32', 'uint16' or 'uint8' (fixed point, see COVERAGE_SCALES)
+        backend : str
+            Kernel backend for accumulating effects: 'numpy' or 'numba'
+        """
+        self.shape = tuple(shape)
+        self.scale = get_coverage_scale(dtype)
+        self.backend = backend
+
+    def to_stored(self, values):
+        """Convert coverage values in [0, 1] to stored units"""
+        if self.scale == 1.0:
+            return values
+        return np.rint(np.asarray(values) * self.scale)
+
+    def from_stored(self, stored):
+        """Convert stored values to coverage values in [0, 1]"""
+        if self.scale == 1.0:
+            return stored
+        return stored.astype(np.float32) / np.float32(self.scale)
+
+class DenseCoverageGrid(CoverageGrid):
+    def __init__(self, shape, dtype=np.float64, backend='numpy'):
+        """
+        Coverage values in [0, 1] held in one dense array
+
+        Parameters:
+        -----------
+        shape : tuple of int
+            Grid shape (rows, columns)
+        dtype : str or np.dtype
+            Storage type: 'float64', 'float32', 'uint16' or 'uint8' (fixed point, see COVERAGE_SCALES)
+        backend : str
+            Kernel backend for accumulating effects: 'numpy' or 'numba'
+        """
+        super().__init__(shape, dtype, backend)
+        self.values = np.zeros(self.shape, dtype=dtype)
+
+    @property
+    def dtype(self):
+        """Storage type of the coverage values"""
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        """Memory used by the coverage values"""
+        return self.values.nbytes
+
+    def accumulate(self, cells, effects):
+        """
+        Add effects to cells and clamp the results at 1.0
+
+        Repeated cells are applied in order, so clamping once afterwards
+        matches clamping after every individual addition.
+
+        Parameters:
+        -----------
+        cells : np.ndarray of int
+            Flat cell indices, possibly repeated
+        effects : np.ndarray
+            Non-negative effect in [0, 1] for each entry of cells
+
+        Returns:
+        --------
+        tuple of np.ndarray
+            Unique touched cells with their values before and after the update
+        """
+        touched, _, old_values, new_values = accumulate_clamped(
+            self.values.reshape(-1), cells, self.to_stored(effects), self.scale, self.backend
+        )
+        return touched, self.from_stored(old_values), self.from_stored(new_values)
+
+    def get(self, cells):
+        """Get the values of flat cell indices"""
+        return self.from_stored(self.values.reshape(-1)[cells])
+
+    def to_array(self, step=1, copy=True, stored=False):
+        """
+        Get the coverage values as a dense array
+
+        Parameters:
+        -----------
+        step : int
+            Keep every step-th row and column (for previews of large grids)
+        copy : bool
+            Return a copy instead of a view of the stored values
+        stored : bool
+            Return stored units (e.g. compact uint8) instead of values in [0, 1]
+        """
+        values = self.values[::step, ::step]
+        if not stored and self.scale != 1.0:
+            return self.from_stored(values)
+        return values.copy() if copy else values
+
+class TiledCoverageGrid(CoverageGrid):
+    def __init__(self, shape, tile_size=64, dtype=np.float64, backend='numpy'):
+        """
+        Coverage values in [0, 1] stored in fixed-size tiles allocated on first touch
+
+        Cells in tiles that were never touched read as 0, so memory grows with
+        the area the drones actually visit rather than with the grid size.
+
+        Parameters:
+        -----------
+        shape : tuple of int
+            Grid shape (rows, columns)
+        tile_size : int
+            Side length of a tile in cells
+        dtype : str or np.dtype
+            Storage type: 'float64', 'float32', 'uint16' or 'uint8' (fixed point, see COVERAGE_SCALES)
+        backend : str
+            Kernel backend for accumulating effects: 'numpy' or 'numba'
+        """
+        super().__init__(shape, dtype, backend)
+        self.tiles = TiledArray(self.shape, tile_size, dtype, 0)
+
+    @property
+    def dtype(self):
+        """Storage type of the coverage values"""
+        return self.tiles.pool.dtype
+
+    @property
+    def nbytes(self):
+        """Memory used by the allocated tiles and the tile table"""
+        return self.tiles.nbytes
+
+    def accumulate(self, cells, effects):
+        """
+        Add effects to cells and clamp the results at 1.0
+
+        Tiles are allocated as cells in them are first touched. Repeated cells
+        are applied in order, exactly as in DenseCoverageGrid.
+
+        Parameters:
+        -----------
+        cells : np.ndarray of int
+            Flat cell indices, possibly repeated
+        effects : np.ndarray
+            Non-negative effect in [0, 1] for each entry of cells
+
+        Returns:
+        --------
+        tuple of np.ndarray
+            Unique touched cells with their values before and after the update
+        """
+        cells = np.asarray(cells, dtype=np.intp)
+        tiles = self.tiles
+        tile_ids, offsets = tiles.locate(cells)
+        tiles.allocate(tile_ids)
+        pool_indices = tiles.tile_slots[tile_ids] * tiles.pool.shape[1] + offsets
+
+        _, first, old_values, new_values = accumulate_clamped(
+            tiles.pool.reshape(-1), pool_indices, self.to_stored(effects), self.scale, self.backend
+        )
+        return cells[first], self.from_stored(old_values), self.from_stored(new_values)
+
+    def get(self, cells):
+        """Get the values of flat cell indices"""
+        return self.from_stored(self.tiles.get(cells))
+
+    def to_array(self, step=1, copy=True, stored=False):
+        """
+        Assemble the coverage values into a new dense array
+
+        Parameters:
+        -----------
+        step : int
+            Keep every step-th row and column (for previews of large grids)
+        copy : bool
+            Ignored; the assembled array is always new
+        stored : bool
+            Return stored units (e.g. compact uint8) instead of values in [0, 1]
+        """
+        rows, columns = self.shape
+        tiles = self.tiles
+        result = np.zeros((-(-rows // step), -(-columns // step)), dtype=tiles.pool.dtype)
+        for tile in np.flatnonzero(tiles.tile_slots >= 0):
+            y0, x0, block = tiles.get_tile(tile)
+
+            # First row and column of this tile that lands on the step lattice
+            first_y = -y0 % step
+            first_x = -x0 % step
+            block = block[first_y::step, first_x::step]
+            out_y = (y0 + first_y) // step
+            out_x = (x0 + first_x) // step
+            result[out_y:out_y + block.shape[0], out_x:out_x + block.shape[1]] = block
+        return result if stored else self.from_stored(result)
+
+def _segment_distance(x, y, start_x, start_y, edge_x, edge_y):
+    """Distance from points to line segments, broadcasting the coordinate arrays"""
+    # Degenerate segments are points; guard their zero length
+    lengths_squared = np.maximum(edge_x * edge_x + edge_y * edge_y, np.finfo(float).tiny)
+    offset_x = x - start_x
+    offset_y = y - start_y
+    # Closest point on each segment, as a fraction along it
+    t = np.clip((offset_x * edge_x + offset_y * edge_y) / lengths_squared, 0, 1)
+    gap_x = offset_x - t * edge_x
+    gap_y = offset_y - t * edge_y
+    return np.sqrt(gap_x * gap_x + gap_y * gap_y)
+
+def segment_distance_matrix(points, starts, ends):
+    """
+    Distance from every point to every line segment
+
+    Parameters:
+    -----------
+    points : np.ndarray
+        Query points, shape (n, 2)
+    starts, ends : np.ndarray
+        Segment end points, shape (m, 2)
+
+    Returns:
+    --------
+    np.ndarray
+        Distances, shape (n, m)
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    edges = np.asarray(ends, dtype=float).reshape(-1, 2) - starts
+    return _segment_distance(points[:, 0, None], points[:, 1, None],
+                             starts[:, 0], starts[:, 1], edges[:, 0], edges[:, 1])
+
+class SignedDistanceField:
+    def __init__(self, polygon, area, cell_size, tile_size=64, chunk_size=1 << 20):
+        """
+        Signed distance to a polygon's boundary at cell centers, stored near the boundary
+
+        Tiles within a tile of the boundary hold exact point-to-edge
+        distances, signed by the area mask. Cells of other tiles are at least
+        a tile from the boundary and read as minus (inside) or plus that
+        distance, which keeps the sign right for inside tests; boundary
+        normals are only needed near the edge. Memory therefore grows with
+        the perimeter, not with the number of cells.
+
+        Indexing with a (rows, columns) pair of integer arrays works as on a
+        dense array, so the field can be passed to bilinear_sample.
+
+        Parameters:
+        -----------
+        polygon : np.ndarray
+            Polygon vertices in grid units, shape (n, 2); the last edge closes it
+        area : AreaMask
+            Cells whose centers are inside the polygon
+        cell_size : float
+            Cell side length in grid units
+        tile_size : int
+            Side length of a tile in cells
+        chunk_size : int
+            Upper bound on tiles times edges measured at once during setup
+        """
+        self.area = area
+        self.shape = area.shape
+        self.far_distance = tile_size * cell_size
+        self.distances = TiledArray(self.shape, tile_size, np.float32, np.nan)
+
+        vertices = np.asarray(polygon, dtype=float)
+        starts = vertices
+        ends = np.roll(vertices, -1, axis=0)
+
+        # Distance from every tile center to every edge, a chunk of tiles at a time
+        distances = self.distances
+        tile_y, tile_x = np.divmod(np.arange(len(distances.tile_slots)), distances.tiles_x)
+        centers = np.column_stack((tile_x + 0.5, tile_y + 0.5)) * self.far_distance
+        half_diagonal = self.far_distance / np.sqrt(2)
+        step = max(1, chunk_size // len(vertices))
+        for first in range(0, len(centers), step):
+            tile_distances = segment_distance_matrix(centers[first:first + step], starts, ends)
+            nearest = tile_distances.min(axis=1)
+
+            # Tiles whose cells may lie within a tile of the boundary
+            for k in np.flatnonzero(nearest <= half_diagonal + self.far_distance):
+                # Every cell's nearest edge lies within two half diagonals
+                # beyond the tile center's nearest one
+                candidates = tile_distances[k] <= nearest[k] + 2 * half_diagonal
+                tile = first + k
+                distances.allocate([tile])
+                y0, x0, block = distances.get_tile(tile)
+                height, width = block.shape
+                cell_distances = self._measure_block(y0, x0, height, width, starts[candidates],
+                                                     ends[candidates], cell_size)
+                inside = area.block(y0, y0 + height, x0, x0 + width)
+                block[:] = np.where(inside, -1, 1) * cell_distances.reshape(height, width)
+
+    @staticmethod
+    def _measure_block(y0, x0, height, width, starts, ends, cell_size, sub_size=4):
+        """Distances from the cell centers of a block to the nearest of some edges, row-major"""
+        # Keep, for each square sub-block, only the edges that can be nearest
+        # to one of its cells (the same bound as for whole tiles)
+        subs_x = -(-width // sub_size)
+        n_subs = -(-height // sub_size) * subs_x
+        sub_y, sub_x = np.divmod(np.arange(n_subs), subs_x)
+        sub_centers = np.column_stack((x0 + (sub_x + 0.5) * sub_size, y0 + (sub_y + 0.5) * sub_size)) * cell_size
+        sub_distances = segment_distance_matrix(sub_centers, starts, ends)
+        reach = np.sqrt(2) * sub_size * cell_size
+        sub_ids, edge_ids = np.nonzero(sub_distances <= sub_distances.min(axis=1, keepdims=True) + reach)
+        edge_counts = np.bincount(sub_ids, minlength=n_subs)
+        edge_offsets = np.cumsum(edge_counts) - edge_counts
+
+        # Pair every cell with its sub-block's edges, one contiguous group per cell
+        cell_y, cell_x = np.divmod(np.arange(height * width), width)
+        cell_subs = (cell_y // sub_size) * subs_x + cell_x // sub_size
+        pairs = edge_counts[cell_subs]
+        first = np.cumsum(pairs) - pairs
+        pair_cells = np.repeat(np.arange(height * width), pairs)
+        pair_edges = edge_ids[np.repeat(edge_offsets[cell_subs] - first, pairs) + np.arange(first[-1] + pairs[-1])]
+        edges = ends - starts
+        pair_distances = _segment_distance((x0 + cell_x[pair_cells] + 0.5) * cell_size,
+                                           (y0 + cell_y[pair_cells] + 0.5) * cell_size,
+                                           starts[pair_edges, 0], starts[pair_edges, 1],
+                                           edges[pair_edges, 0], edges[pair_edges, 1])
+        return np.minimum.reduceat(pair_distances, first)
+
+    @property
+    def nbytes(self):
+        """Memory used by the stored tiles"""
+        return self.distances.nbytes
+
+    def __getitem__(self, key):
+        """Get the signed distances at (rows, columns) arrays of cells"""
+        rows = np.asarray(key[0], dtype=np.intp)
+        columns = np.asarray(key[1], dtype=np.intp)
+        distances = self.distances
+        size = distances.tile_size
+        slots = distances.tile_slots[(rows // size) * distances.tiles_x + columns // size]
+        values = distances.pool[slots, (rows % size) * size + columns % size].astype(float)
+
+        # Cells of tiles that are not stored lie at least a tile from the boundary
+        far = np.flatnonzero(slots < 0)
+        if far.size:
+            inside = self.area.contains(rows[far] * self.shape[1] + columns[far])
+            values[far] = np.where(inside, -self.far_distance, self.far_distance)
+        return values
+
+def bilinear_sample(field, u, v):
+    """
+    Sample a 2D field at fractional cell positions
+
+    Parameters:
+    -----------
+    field : np.ndarray or SignedDistanceField
+        Values at cell centers, indexed (row, column)
+    u : np.ndarray
+        Fractional column positions (clamped to the field)
+    v : np.ndarray
+        Fractional row positions (clamped to the field)
+
+    Returns:
+    --------
+    np.ndarray
+        Interpolated values
+    """
+    rows, columns = field.shape
+    u = np.clip(u, 0, columns - 1)
+    v = np.clip(v, 0, rows - 1)
+    u0 = np.minimum(u.astype(int), max(columns - 2, 0))
+    v0 = np.minimum(v.astype(int), max(rows - 2, 0))
+    u1 = np.minimum(u0 + 1, columns - 1)
+    v1 = np.minimum(v0 + 1, rows - 1)
+    fu = u - u0
+    fv = v - v0
+    # Gather the four corners in one lookup
+    corners = field[np.concatenate((v0, v0, v1, v1)), np.concatenate((u0, u1, u0, u1))]
+    top_left, top_right, bottom_left, bottom_right = corners.reshape(4, -1)
+    top = top_left * (1 - fu) + top_right * fu
+    bottom = bottom_left * (1 - fu) + bottom_right * fu
+    return top * (1 - fv) + bottom * fv
+
+def capsule_cells(starts, ends, radius, shape):
+    """
+    Find the cells within a radius of line segments (swept circles)
+
+    The candidate cells of all segments are enumerated in one ragged batch,
+    row by row over the span of columns the capsule can reach in that row,
+    and the position of every cell relative to its segment is computed at once.
+
+    Parameters:
+    -----------
+    starts : np.ndarray of int
+        Segment start cells as (column, row), shape (n, 2)
+    ends : np.ndarray of int
+        Segment end cells as (column, row), shape (n, 2)
+    radius : int
+        Radius in cells
+    shape : tuple of int
+        Grid shape (rows, columns)
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        For every cell within the radius, grouped by segment in input order:
+        its flat index, the index of its segment, its position along the
+        segment's line measured from the start and its distance from that
+        line (for a zero-length segment, the distance from the point), in cells
+    """
+    rows, columns = shape
+    starts = np.asarray(starts, dtype=np.intp).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.intp).reshape(-1, 2)
+
+    # Rows covered by each capsule, clipped to the grid
+    y0 = np.maximum(np.minimum(starts[:, 1], ends[:, 1]) - radius, 0)
+    y1 = np.minimum(np.maximum(starts[:, 1], ends[:, 1]) + radius, rows - 1)
+    heights = np.maximum(y1 - y0 + 1, 0)
+    row_segment = np.repeat(np.arange(len(heights)), heights)
+    row_y = y0[row_segment] + np.arange(heights.sum()) - np.repeat(np.cumsum(heights) - heights, heights)
+
+    # Part of the segment within the radius of each row, and the columns it can reach
+    ax = starts[row_segment, 0]
+    ay = starts[row_segment, 1]
+    dx = ends[row_segment, 0] - ax
+    dy = ends[row_segment, 1] - ay
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (row_y - radius - ay) / dy
+        t2 = (row_y + radius - ay) / dy
+    flat_row = dy == 0
+    t_lo = np.where(flat_row, 0, np.clip(np.minimum(t1, t2), 0, 1))
+    t_hi = np.where(flat_row, 1, np.clip(np.maximum(t1, t2), 0, 1))
+    xa = ax + t_lo * dx
+    xb = ax + t_hi * dx
+    x0 = np.maximum(np.floor(np.minimum(xa, xb)).astype(np.intp) - radius, 0)
+    x1 = np.minimum(np.ceil(np.maximum(xa, xb)).astype(np.intp) + radius, columns - 1)
+    widths = np.maximum(x1 - x0 + 1, 0)
+
+    # Enumerate the candidate cells, row by row and segment by segment
+    row = np.repeat(np.arange(len(widths)), widths)
+    local = np.arange(widths.sum()) - np.repeat(np.cumsum(widths) - widths, widths)
+    segment = row_segment[row]
+    y = row_y[row]
+    x = x0[row] + local
+
+    # Project each cell onto its segment's line
+    dx = x - starts[segment, 0]
+    dy = y - starts[segment, 1]
+    direction = (ends - starts).astype(float)
+    length = np.sqrt(np.sum(direction * direction, axis=1))
+    direction /= np.maximum(length, 1e-12)[:, None]
+    along = dx * direction[segment, 0] + dy * direction[segment, 1]
+    across = np.abs(dx * direction[segment, 1] - dy * direction[segment, 0])
+    across = np.where(length[segment] > 0, across, np.sqrt(dx*dx + dy*dy))
+
+    # Distance to the closest point of the segment
+    overshoot = np.maximum(np.maximum(-along, along - length[segment]), 0)
+    within = overshoot*overshoot + across*across <= radius*radius
+    return (y * columns + x)[within], segment[within], along[within], across[within]
+
+def segment_falloff_integral(along, across, length, radius):
+    """
+    Integrate a linear distance falloff, max(0, 1 - distance / radius), along segments
+
+    For a cell at a given distance from a segment's line, this is the
+    falloff it sees summed over every point of the segment, which is the
+    continuous version of stamping a circular footprint at many points
+    along the move.
+
+    Parameters:
+    -----------
+    along : np.ndarray
+        Position of the cell's projection along the segment, from its start
+    across : np.ndarray
+        Distance of the cell from the segment's line
+    length : np.ndarray
+        Length of the segment
+    radius : float
+        Radius at which the falloff reaches zero
+
+    Returns:
+    --------
+    np.ndarray
+        The integral, in falloff times length units
+    """
+    along = np.asarray(along, dtype=float)
+    across = np.asarray(across, dtype=float)
+    h2 = across * across
+    half_chord = np.sqrt(np.maximum(radius*radius - h2, 0))
+
+    # Chord of the falloff circle that lies on the segment, relative to the projection
+    lo = np.maximum(-half_chord, -along)
+    hi = np.minimum(half_chord, length - along)
+
+    def antiderivative(s):
+        # Integral of 1 - sqrt(h² + s²) / r; h² * asinh(s / h) vanishes as h -> 0
+        root = np.sqrt(h2 + s*s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_term = np.where(across > 0, h2 * np.arcsinh(s / np.where(across > 0, across, 1)), 0)
+        return s - (s * root + log_term) / (2 * radius)
+
+    return np.where(hi > lo, antiderivative(hi) - antiderivative(lo), 0)
@@ -0,0 +1,226 @@
+# src/utils/kernel_utils.py
+
+import numpy as np
+
+# Numba is optional: without it every kernel runs on the vectorized NumPy path
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+KERNEL_BACKENDS = ['auto', 'numpy', 'numba']
+
+def jit(function):
+    """Compile a kernel loop with Numba when it is installed, else return it unchanged"""
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True, nogil=True)(function)
+    return function
+
+def resolve_kernel_backend(backend='auto'):
+    """
+    Resolve a kernel backend name to the backend that will run
+
+    Parameters:
+    -----------
+    backend : str
+        'auto' uses Numba when it is installed and NumPy otherwise,
+        'numpy' always uses the vectorized NumPy kernels and 'numba'
+        requires Numba
+
+    Returns:
+    --------
+    str
+        'numpy' or 'numba'
+    """
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Unsupported kernel backend '{backend}'. Choose from {KERNEL_BACKENDS}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ValueError("The 'numba' kernel backend requires Numba to be installed")
+    if backend == 'auto':
+        return 'numba' if NUMBA_AVAILABLE else 'numpy'
+    return backend
+
+# The loops below are written for Numba and perform the same floating point
+# operations in the same order as the NumPy kernels, so both backends give
+# bit-identical results.
+
+def _stamp_footprints_loop(centers, offsets_y, offsets_x, effects, resolution):
+    n_centers = centers.shape[0]
+    n_offsets = effects.shape[0]
+    flat_indices = np.empty(n_centers * n_offsets, dtype=np.intp)
+    cell_effects = np.empty(n_centers * n_offsets, dtype=effects.dtype)
+    count = 0
+    for i in range(n_centers):
+        for j in range(n_offsets):
+            x = centers[i, 0] + offsets_x[j]
+            y = centers[i, 1] + offsets_y[j]
+            if x >= 0 and x < resolution and y >= 0 and y < resolution:
+                flat_indices[count] = y * resolution + x
+                cell_effects[count] = effects[j]
+                count += 1
+    return flat_indices[:count], cell_effects[:count]
+
+def _unique_first_loop(indices):
+    # Sorted unique indices, the position of their first occurrence and the
+    # unique slot of every entry, as np.unique(return_index, return_inverse)
+    order = np.argsort(indices, kind='mergesort')
+    inverse = np.empty(indices.shape[0], dtype=np.intp)
+    touched = np.empty(indices.shape[0], dtype=indices.dtype)
+    first = np.empty(indices.shape[0], dtype=np.intp)
+    count = 0
+    for k in range(order.shape[0]):
+        i = order[k]
+        if count == 0 or indices[i] != touched[count - 1]:
+            touched[count] = indices[i]
+            first[count] = i
+            count += 1
+        inverse[i] = count - 1
+    return touched[:count], first[:count], inverse
+
+# Compiled before the loops that call it, which Numba resolves as globals
+_unique_first_jit = jit(_unique_first_loop)
+
+def _accumulate_float_loop(flat, indices, effects, limit):
+    touched, first, _ = _unique_first_jit(indices)
+    old_values = np.empty(touched.shape[0], dtype=flat.dtype)
+    for k in range(touched.shape[0]):
+        old_values[k] = flat[touched[k]]
+    for i in range(indices.shape[0]):
+        flat[indices[i]] += effects[i]
+    new_values = np.empty(touched.shape[0], dtype=flat.dtype)
+    for k in range(touched.shape[0]):
+        new_values[k] = min(limit, flat[touched[k]])
+        flat[touched[k]] = new_values[k]
+    return touched, first, old_values, new_values
+
+def _accumulate_integer_loop(flat, indices, effects, limit):
+    touched, first, inverse = _unique_first_jit(indices)
+    sums = np.zeros(touched.shape[0])
+    for i in range(indices.shape[0]):
+        sums[inverse[i]] += effects[i]
+    old_values = np.empty(touched.shape[0], dtype=flat.dtype)
+    new_values = np.empty(touched.shape[0], dtype=flat.dtype)
+    for k in range(touched.shape[0]):
+        old_values[k] = flat[touched[k]]
+        new_values[k] = int(min(limit, old_values[k] + sums[k]))
+        flat[touched[k]] = new_values[k]
+    return touched, first, old_values, new_values
+
+def _steer_and_move_loop(positions, velocities, delta, distance, steering, speed, time_step):
+    new_positions = np.empty_like(positions)
+    s = 0
+    for i in range(positions.shape[0]):
+        if steering[i]:
+            velocities[i, 0] = delta[i, 0] / distance[i] * speed[s]
+            velocities[i, 1] = delta[i, 1] / distance[i] * speed[s]
+            s += 1
+        move_x = velocities[i, 0] * time_step
+        move_y = velocities[i, 1] * time_step
+        move_length = np.sqrt(move_x*move_x + move_y*move_y)
+        if steering[i] and move_length > distance[i]:
+            ratio = distance[i] / move_length
+            move_x *= ratio
+            move_y *= ratio
+        new_positions[i, 0] = positions[i, 0] + move_x
+        new_positions[i, 1] = positions[i, 1] + move_y
+    return new_positions
+
+def _count_crossings_loop(old_values, new_values, threshold):
+    count = 0
+    for k in range(old_values.shape[0]):
+        if old_values[k] <= threshold and new_values[k] > threshold:
+            count += 1
+    return count
+
+_stamp_footprints_jit = jit(_stamp_footprints_loop)
+_accumulate_float_jit = jit(_accumulate_float_loop)
+_accumulate_integer_jit = jit(_accumulate_integer_loop)
+_steer_and_move_jit = jit(_steer_and_move_loop)
+_count_crossings_jit = jit(_count_crossings_loop)
+
+def stamp_footprints(centers, offsets_y, offsets_x, effects, resolution, backend='numpy'):
+    """
+    Stamp a footprint kernel around every center of a square grid
+
+    Parameters:
+    -----------
+    centers : np.ndarray of int
+        (column, row) center cells, shape (n, 2)
+    offsets_y, offsets_x : np.ndarray of int
+        Row and column offsets of the kernel cells
+    effects : np.ndarray
+        Effect of each kernel cell
+    resolution : int
+        Number of cells along each side of the grid
+    backend : str
+        'numpy' or 'numba' (see resolve_kernel_backend)
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        Flat indices of the stamped cells within the grid, grouped by
+        center, and the effect for each of them
+    """
+    if backend == 'numba':
+        return _stamp_footprints_jit(centers, offsets_y, offsets_x, effects, resolution)
+    nx = centers[:, 0, None] + offsets_x
+    ny = centers[:, 1, None] + offsets_y
+    valid = (nx >= 0) & (nx < resolution) & (ny >= 0) & (ny < resolution)
+    flat_indices = ny[valid] * resolution + nx[valid]
+    cell_effects = np.broadcast_to(effects, valid.shape)[valid]
+    return flat_indices, cell_effects
+
+def accumulate_clamped_numba(flat, indices, effects, limit):
+    """Compiled equivalent of grid_utils.accumulate_clamped (requires the 'numba' backend)"""
+    indices = np.ascontiguousarray(indices, dtype=np.intp)
+    effects = np.ascontiguousarray(effects, dtype=np.float64)
+    if np.issubdtype(flat.dtype, np.integer):
+        return _accumulate_integer_jit(flat, indices, effects, float(limit))
+    return _accumulate_float_jit(flat, indices, effects, flat.dtype.type(limit))
+
+def steer_and_move(positions, velocities, delta, distance, steering, speed, time_step, backend='numpy'):
+    """
+    Steer drones towards their targets and move them by one time step
+
+    Parameters:
+    -----------
+    positions : np.ndarray
+        Drone positions, shape (n, 2)
+    velocities : np.ndarray
+        Drone velocities, shape (n, 2); rows of steering drones are updated in place
+    delta : np.ndarray
+        Offset from each drone to its target, shape (n, 2)
+    distance : np.ndarray
+        Length of each offset
+    steering : np.ndarray of bool
+        Drones that turn towards their target; only these are kept from
+        overshooting it
+    speed : np.ndarray
+        New speed of each steering drone, in drone order
+    time_step : float
+        Duration of the step
+
+    Returns:
+    --------
+    np.ndarray
+        New drone positions, shape (n, 2)
+    """
+    if backend == 'numba':
+        return _steer_and_move_jit(positions, velocities, delta, distance, steering, speed, time_step)
+    velocities[steering] = delta[steering] / distance[steering, None] * speed[:, None]
+    moves = velocities * time_step
+    move_length = np.sqrt(moves[:, 0]*moves[:, 0] + moves[:, 1]*moves[:, 1])
+    overshoot = steering & (move_length > distance)
+    moves[overshoot] *= (distance[overshoot] / move_length[overshoot])[:, None]
+    return positions + moves
+
+def count_crossings(old_values, new_values, threshold, backend='numpy'):
+    """Count the values that rise from at most a threshold to above it"""
+    if backend == 'numba':
+        # Compare in the values' own type, as NumPy does, rather than letting
+        # Numba promote float32 values to the float64 threshold
+        return int(_count_crossings_jit(old_values, new_values, old_values.dtype.type(threshold)))
+    crossed = (old_values <= threshold) & (new_values > threshold)
+    return int(np.count_nonzero(crossed))
@@ -0,0 +1,173 @@
+# src/utils/profile_utils.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+# Shared no-op context returned by a disabled profiler
+_NO_PHASE = nullcontext()
+
+class PhaseProfiler:
+    def __init__(self, enabled=False):
+        """
+        Records how long each phase of a simulation step takes
+
+        While disabled, phase() returns a shared no-op context, so the
+        instrumented code costs one method call per phase.
+
+        Parameters:
+        -----------
+        enabled : bool
+            Start recording immediately
+        """
+        self.enabled = enabled
+        self.events = []  # (name, start_ns, duration_ns, thread id, step)
+        self.step = None
+        self._origin = time.perf_counter_ns()
+
+    def enable(self):
+        """Start recording phases"""
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording phases (recorded events are kept)"""
+        self.enabled = False
+
+    def reset(self):
+        """Discard all recorded events"""
+        self.events = []
+        self._origin = time.perf_counter_ns()
+
+    def phase(self, name):
+        """
+        Time a block of code as a named phase
+
+        Phases may be nested; a phase's time includes the phases inside it.
+
+        Parameters:
+        -----------
+        name : str
+            Phase name, e.g. 'targets' or 'grid_update'
+        """
+        if not self.enabled:
+            return _NO_PHASE
+        return self._record(name)
+
+    @contextmanager
+    def _record(self, name):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.events.append((name, start - self._origin, end - start, threading.get_ident(), self.step))
+
+    def stats(self):
+        """Get the per-phase statistics of the recorded events (see ProfileStats)"""
+        return ProfileStats(self.events)
+
+class ProfileStats:
+    def __init__(self, events):
+        """
+        Per-phase timing statistics
+
+        Parameters:
+        -----------
+        events : list of tuple
+            Recorded (name, start_ns, duration_ns, thread id, step) events
+        """
+        self.events = list(events)
+        self.phases = {}
+        for name, _, duration, _, _ in self.events:
+            self.phases.setdefault(name, []).append(duration)
+        self.phases = {name: np.asarray(durations, dtype=np.int64) for name, durations in self.phases.items()}
+
+    def totals(self):
+        """Total seconds spent in each phase"""
+        return {name: float(durations.sum()) / 1e9 for name, durations in self.phases.items()}
+
+    def counts(self):
+        """Number of times each phase was recorded"""
+        return {name: len(durations) for name, durations in self.phases.items()}
+
+    def summary(self):
+        """
+        Get count, total, mean and percentiles for each phase
+
+        Returns:
+        --------
+        dict
+            Phase name to a dict of 'count', 'total_s', 'mean_ms', 'p50_ms',
+            'p95_ms' and 'max_ms'
+        """
+        summary = {}
+        for name, durations in self.phases.items():
+            milliseconds = durations / 1e6
+            p50, p95 = np.percentile(milliseconds, [50, 95])
+            summary[name] = {
+                'count': len(durations),
+                'total_s': float(durations.sum()) / 1e9,
+                'mean_ms': float(milliseconds.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'max_ms': float(milliseconds.max())
+            }
+        return summary
+
+    def histogram(self, name, bins=20):
+        """
+        Histogram of a phase's durations on logarithmic bins
+
+        Parameters:
+        -----------
+        name : str
+            Phase name
+        bins : int
+            Number of bins
+
+        Returns:
+        --------
+        tuple of np.ndarray
+            Counts and bin edges in milliseconds
+        """
+        milliseconds = self.phases[name] / 1e6
+        low = max(milliseconds.min(), 1e-4)
+        high = max(milliseconds.max(), low * 1.01)
+        return np.histogram(milliseconds, bins=np.geomspace(low, high, bins + 1))
+
+    def to_dict(self, bins=20):
+        """Summary and histograms of every phase as a JSON-serializable dict"""
+        histograms = {}
+        for name in self.phases:
+            counts, edges = self.histogram(name, bins)
+            histograms[name] = {'counts': counts.tolist(), 'edges_ms': edges.tolist()}
+        return {'summary': self.summary(), 'histograms': histograms}
+
+    def to_json(self, path, bins=20):
+        """Write the summary and histograms to a JSON file"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(bins), f, indent=2)
+
+    def to_chrome_trace(self, path):
+        """
+        Write the recorded events in Chrome trace format
+
+        The file can be opened in chrome://tracing or Perfetto.
+
+        Parameters:
+        -----------
+        path : str
+            Output file path
+        """
+        pid = os.getpid()
+        trace_events = []
+        for name, start, duration, thread, step in self.events:
+            event = {'name': name, 'ph': 'X', 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': pid, 'tid': thread}
+            if step is not None:
+                event['args'] = {'step': step}
+            trace_events.append(event)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,78 @@
+# src/utils/projection_utils.py
+
+from functools import lru_cache
+import numpy as np
+from pyproj import Transformer
+
+GEOGRAPHIC_CRS = "EPSG:4326"
+PROJECTIONS = ['utm', 'equal_area']
+
+@lru_cache(maxsize=32)
+def get_transformer(source_crs, target_crs):
+    """Get a cached (x, y) order transformer between two coordinate reference systems"""
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+def get_local_crs(lon, lat, projection='utm'):
+    """
+    Get a metric projected CRS centred on a location
+
+    Parameters:
+    -----------
+    lon, lat : float
+        Location (e.g. the centre of the search area) in degrees
+    projection : str
+        'utm' for the UTM zone containing the location, 'equal_area' for a
+        Lambert azimuthal equal-area projection centred on it
+
+    Returns:
+    --------
+    str
+        CRS definition usable by pyproj
+    """
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unsupported projection '{projection}'. Choose from {PROJECTIONS}")
+    if projection == 'utm':
+        zone = min(int((lon + 180) // 6) + 1, 60)
+        return f"EPSG:{32600 + zone if lat >= 0 else 32700 + zone}"
+    # Round the centre so that nearby areas share one cached transformer
+    return f"+proj=laea +lat_0={round(lat, 2)} +lon_0={round(lon, 2)} +datum=WGS84 +units=m +no_defs"
+
+def project_coords(coords, crs):
+    """
+    Project (lon, lat) coordinates to a CRS in one batched call
+
+    Parameters:
+    -----------
+    coords : array-like
+        Coordinates, shape (..., 2)
+    crs : str
+        Target CRS
+
+    Returns:
+    --------
+    np.ndarray
+        Projected (x, y) coordinates, same shape as coords
+    """
+    coords = np.asarray(coords, dtype=float)
+    x, y = get_transformer(GEOGRAPHIC_CRS, crs).transform(coords[..., 0], coords[..., 1])
+    return np.stack((x, y), axis=-1)
+
+def unproject_coords(points, crs):
+    """
+    Convert projected (x, y) coordinates back to (lon, lat) in one batched call
+
+    Parameters:
+    -----------
+    points : array-like
+        Projected coordinates, shape (..., 2)
+    crs : str
+        CRS of the points
+
+    Returns:
+    --------
+    np.ndarray
+        (lon, lat) coordinates, same shape as points
+    """
+    points = np.asarray(points, dtype=float)
+    lon, lat = get_transformer(crs, GEOGRAPHIC_CRS).transform(points[..., 0], points[..., 1])
+    return np.stack((lon, lat), axis=-1)
@@ -1,61 +1,265 @@
 # src/utils/simulation_utils.py
 
 import numpy as np
-import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
-import io
 import base64
+import asyncio
+import struct
+import threading
+import zlib
 from IPython.display import HTML, display, clear_output
+from src.utils.profile_utils import ProfileStats
 
-def create_coverage_visualization(exploration_grid):
-    """Create a visualization of the exploration grid as a base64 PNG"""
-    # Create a figure
-    fig, ax = plt.subplots(figsize=(4, 4))
+# Greens with transparency, sampled once into a 256-entry RGBA lookup table
+COVERAGE_COLORS = [(0, 0, 0, 0), (0.2, 0.8, 0.2, 0.6)]
+COVERAGE_LUT = LinearSegmentedColormap.from_list('coverage', COVERAGE_COLORS)(np.linspace(0, 1, 256), bytes=True)
+
+def encode_png(rgba, compress_level=1):
+    """
+    Encode an RGBA image as PNG bytes
     
-    # Create a custom colormap (greens with transparency)
-    colors = [(0, 0, 0, 0), (0.2, 0.8, 0.2, 0.6)]
-    cmap = LinearSegmentedColormap.from_list('coverage', colors)
+    Parameters:
+    -----------
+    rgba : np.ndarray of uint8
+        Image, shape (rows, columns, 4), first row at the top
+    compress_level : int
+        zlib compression level (0-9); low levels are much faster on noisy grids
     
-    # Plot the exploration grid
-    im = ax.imshow(exploration_grid, cmap=cmap, interpolation='bilinear')
+    Returns:
+    --------
+    bytes
+        The PNG file contents
+    """
+    rows, columns = rgba.shape[:2]
     
-    # Remove axis ticks and labels
-    ax.set_xticks([])
-    ax.set_yticks([])
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
     
-    # Remove spines
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-        
-    # Save to a bytes buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0, transparent=True)
-    plt.close(fig)
+    # Every scanline starts with filter type 0 (none)
+    scanlines = np.zeros((rows, columns * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = np.ascontiguousarray(rgba, dtype=np.uint8).reshape(rows, columns * 4)
+    header = struct.pack('>IIBBBBB', columns, rows, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(scanlines.tobytes(), compress_level)) + chunk(b'IEND', b''))
+
+def render_coverage_rgba(exploration_grid, value_range=None, scale=1):
+    """
+    Map an exploration grid to RGBA colors through COVERAGE_LUT
     
-    # Encode as base64
-    buf.seek(0)
-    img_str = base64.b64encode(buf.read()).decode('utf-8')
+    Parameters:
+    -----------
+    exploration_grid : np.ndarray
+        Coverage values, indexed (row, column); row 0 is drawn at the top
+    value_range : tuple of float, optional
+        Values mapped to the ends of the colormap; by default the grid's own
+        minimum and maximum, as matplotlib's imshow does
+    scale : int
+        Repeat every cell scale x scale times (nearest-neighbour upscaling)
     
-    return img_str
+    Returns:
+    --------
+    np.ndarray of uint8
+        Image, shape (rows * scale, columns * scale, 4)
+    """
+    grid = np.asarray(exploration_grid, dtype=np.float32)
+    if value_range is None:
+        low, high = (float(grid.min()), float(grid.max())) if grid.size else (0.0, 1.0)
+    else:
+        low, high = value_range
+    span = high - low if high > low else 1.0
+    levels = np.clip((grid - low) * (255 / span), 0, 255).astype(np.uint8)
+    rgba = COVERAGE_LUT[levels]
+    if scale > 1:
+        rgba = np.repeat(np.repeat(rgba, scale, axis=0), scale, axis=1)
+    return rgba
+
+def render_coverage_png(exploration_grid, value_range=None, scale=1):
+    """
+    Render an exploration grid as PNG bytes, without a matplotlib figure
+    
+    The bytes can be shown directly with widgets.Image(value=png, format='png').
+    See render_coverage_rgba for the parameters.
+    """
+    return encode_png(render_coverage_rgba(exploration_grid, value_range, scale))
+
+def create_coverage_visualization(exploration_grid):
+    """Create a visualization of the exploration grid as a base64 PNG"""
+    return base64.b64encode(render_coverage_png(exploration_grid)).decode('utf-8')
 
 def display_coverage_progression(visualizations):
     """Display a series of coverage visualizations"""
     html_parts = ["<div style='display:flex; flex-wrap:wrap; justify-content:center;'>"]
     
     for viz in visualizations:
+        img = base64.b64encode(viz['png']).decode('utf-8') if 'png' in viz else viz['img']
         html_parts.append(
             f"<div style='display:inline-block; margin:10px; text-align:center;'>"
             f"<p>Step {viz['step']}<br>Coverage: {viz['coverage']:.1f}%</p>"
-            f"<img src='data:image/png;base64,{viz['img']}' style='width:150px; border:1px solid #ddd'/>"
+            f"<img src='data:image/png;base64,{img}' style='width:150px; border:1px solid #ddd'/>"
             f"</div>"
         )
     
     html_parts.append("</div>")
     return HTML("".join(html_parts))
 
-def run_simulation(simulation, max_steps, viz_steps, progress_callback=None, status_callback=None):
+def iter_steps(simulation, max_steps, output='delta', stop_at_coverage=None):
+    """
+    Run a simulation step by step, yielding each step's result as it is produced
+    
+    Steps are only computed when the consumer asks for the next one, and
+    closing the generator (or breaking out of the loop) stops the simulation.
+    
+    Parameters:
+    -----------
+    simulation : DroneSearchSimulation
+        The simulation instance
+    max_steps : int
+        Maximum number of steps to run
+    output : str
+        Step result format passed to simulate_step ('delta', 'view' or 'full')
+    stop_at_coverage : float, optional
+        Stop once coverage reaches this percentage
+    
+    Yields:
+    -------
+    dict
+        The step result, with 'step' set to the 0-based step index
+    """
+    for step in range(max_steps):
+        result = simulation.simulate_step(output=output)
+        result['step'] = step
+        yield result
+        
+        if stop_at_coverage is not None and result['coverage_percent'] >= stop_at_coverage:
+            return
+
+async def aiter_steps(simulation, max_steps, output='delta', stop_at_coverage=None, in_thread=False):
+    """
+    Asynchronous twin of iter_steps
+    
+    Control returns to the event loop after every step, so other tasks (UI
+    updates, a stop button) keep running, and cancelling the consuming task
+    stops the simulation between steps.
+    
+    Parameters:
+    -----------
+    simulation : DroneSearchSimulation
+        The simulation instance
+    max_steps : int
+        Maximum number of steps to run
+    output : str
+        Step result format passed to simulate_step ('delta', 'view' or 'full')
+    stop_at_coverage : float, optional
+        Stop once coverage reaches this percentage
+    in_thread : bool
+        Compute each step in the default executor instead of the event loop thread
+    
+    Yields:
+    -------
+    dict
+        The step result, with 'step' set to the 0-based step index
+    """
+    loop = asyncio.get_running_loop()
+    for step in range(max_steps):
+        if in_thread:
+            result = await loop.run_in_executor(None, simulation.simulate_step, output)
+        else:
+            result = simulation.simulate_step(output=output)
+            await asyncio.sleep(0)
+        result['step'] = step
+        yield result
+        
+        if stop_at_coverage is not None and result['coverage_percent'] >= stop_at_coverage:
+            return
+
+class SimulationRun:
+    def __init__(self, target, stop_event=None):
+        """
+        Handle of a simulation running in a background thread
+        
+        Parameters:
+        -----------
+        target : function
+            Called with this handle in the worker thread; its return value
+            becomes the run's result
+        stop_event : threading.Event, optional
+            Event to use as the run's stop event, so that setting it cancels
+            the run; cancel() then sets this event too. A new event if omitted
+        """
+        self.progress = 0.0
+        self._target = target
+        self._stop_event = stop_event if stop_event is not None else threading.Event()
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        """Start the worker thread and return this handle"""
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        try:
+            self._result = self._target(self)
+        except BaseException as e:
+            self._error = e
+        finally:
+            with self._lock:
+                self._done_event.set()
+                callbacks = list(self._callbacks)
+            for callback in callbacks:
+                callback(self)
+    
+    @property
+    def stop_event(self):
+        """Event that is set once cancellation is requested"""
+        return self._stop_event
+    
+    def cancel(self):
+        """Ask the run to stop; it stops after the step in progress"""
+        self._stop_event.set()
+    
+    def cancelled(self):
+        """Check whether cancellation was requested"""
+        return self._stop_event.is_set()
+    
+    def done(self):
+        """Check whether the run has finished (completed, cancelled or failed)"""
+        return self._done_event.is_set()
+    
+    def result(self, timeout=None):
+        """
+        Wait for the run to finish and get its results
+        
+        Parameters:
+        -----------
+        timeout : float, optional
+            Maximum number of seconds to wait
+        
+        Returns:
+        --------
+        dict
+            The results of run_simulation (partial if the run was cancelled)
+        """
+        if not self._done_event.wait(timeout):
+            raise TimeoutError("The simulation is still running")
+        if self._error is not None:
+            raise self._error
+        return self._result
+    
+    def add_done_callback(self, callback):
+        """Call a function with this handle once the run finishes (in the worker thread)"""
+        with self._lock:
+            if not self._done_event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+def run_simulation(simulation, max_steps, viz_steps, progress_callback=None, status_callback=None, profile=False,
+                   map_viewer=None, overlay_interval=0.1, background=False, stop_event=None, viz_size=1024):
     """
     Run a simulation for the specified number of steps
     
@@ -71,12 +275,42 @@ def run_simulation(simulation, max_steps, viz_steps, progress_callback=None, sta
         Function to call with progress updates (0-100)
     status_callback : function, optional
         Function to call with status updates
+    profile : bool
+        Record per-phase timings of the steps and of the visualizations
+        during this run and return them under 'profile' (a ProfileStats)
+    map_viewer : MapViewer, optional
+        Map on which to animate the drones, their paths and the coverage
+        overlay live (see MapViewer.show_simulation)
+    overlay_interval : float
+        Minimum number of seconds between two map updates
+    background : bool
+        Run in a background thread and return a SimulationRun handle at once,
+        with cancel(), progress and result(); the callbacks are then called
+        from the worker thread
+    stop_event : threading.Event, optional
+        Stop the run between steps once this event is set; in the background
+        it becomes the handle's stop event, so cancel() also sets it
+    viz_size : int
+        Largest side in pixels of the saved visualizations; larger grids are
+        subsampled (see DroneSearchSimulation.get_coverage_preview)
     
     Returns:
     --------
-    dict
-        A dictionary containing simulation results
+    dict or SimulationRun
+        A dictionary containing simulation results, with 'steps' run and
+        whether the run was 'cancelled'; the run's handle if background.
+        For the tiled store the final result has no dense 'exploration_grid'
     """
+    if background:
+        def target(run):
+            def track_progress(value):
+                run.progress = value
+                if progress_callback:
+                    progress_callback(value)
+            return run_simulation(simulation, max_steps, viz_steps, track_progress, status_callback, profile,
+                                  map_viewer, overlay_interval, stop_event=run.stop_event, viz_size=viz_size)
+        return SimulationRun(target, stop_event).start()
+    
     # Helper functions for updates
     def update_progress(value):
         if progress_callback:
@@ -93,31 +327,68 @@ def run_simulation(simulation, max_steps, viz_steps, progress_callback=None, sta
     # Store visualizations
     visualizations = []
     
-    # Run simulation steps
-    for step in range(max_steps):
-        # Simulate one step
-        result = simulation.simulate_step()
+    # Profile this run only, keeping the simulation's own setting afterwards
+    profiler = simulation.profiler
+    was_profiling = profiler.enabled
+    first_event = len(profiler.events)
+    if profile:
+        profiler.enable()
+    
+    # Run simulation steps; grids are only read at the visualization steps
+    viz_steps = set(viz_steps)
+    steps = 0
+    cancelled = False
+    for result in iter_steps(simulation, max_steps, output='delta'):
+        step = result['step']
+        steps = step + 1
         
         # Update progress (0-100%)
         progress_percent = (step + 1) / max_steps * 100
         update_progress(progress_percent)
         
+        # Update the live map (rate limited by the map viewer)
+        if map_viewer is not None:
+            with profiler.phase('map'):
+                map_viewer.show_simulation(simulation, overlay_interval)
+        
         # Save visualization at specific steps
         if step in viz_steps:
-            img = create_coverage_visualization(result['exploration_grid'])
+            with profiler.phase('visualization'):
+                png = render_coverage_png(simulation.get_coverage_preview(viz_size))
             visualizations.append({
                 'step': step,
                 'coverage': result['coverage_percent'],
-                'img': img
+                'png': png
             })
+        
+        # Cooperative cancellation between steps
+        if stop_event is not None and stop_event.is_set() and steps < max_steps:
+            cancelled = True
+            break
+    
+    # The tiled store is meant for grids too large to assemble densely
+    result = simulation.snapshot(include_grid=simulation.coverage_store == 'dense')
+    if map_viewer is not None:
+        map_viewer.show_simulation(simulation, force=True)
+    if profile and not was_profiling:
+        profiler.disable()
     
-    update_status(f"Simulation complete! {max_steps} steps processed.")
+    if cancelled:
+        update_status(f"Simulation cancelled after {steps} of {max_steps} steps.")
+    else:
+        update_status(f"Simulation complete! {max_steps} steps processed.")
     update_status(f"Final coverage: {result['coverage_percent']:.1f}%")
     
     # Return final result and visualizations
-    return {
+    results = {
         'final_result': result,
         'visualizations': visualizations,
         'drone_positions': simulation.get_real_world_positions(),
-        'drone_paths': simulation.get_real_world_paths()
-    }
\ No newline at end of file
+        'drone_paths': simulation.get_real_world_paths(),
+        'steps': steps,
+        'cancelled': cancelled
+    }
+    if profile:
+        # Only the events recorded during this run
+        results['profile'] = ProfileStats(profiler.events[first_event:])
+    return results
\ No newline at end of file
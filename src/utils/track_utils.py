@@ -0,0 +1,272 @@
+# src/utils/track_utils.py
+
+import os
+import tempfile
+import numpy as np
+
+class TrackStore:
+    def __init__(self, n_tracks, capacity=50, keep_history=False, chunk_steps=4096, spill_dir=None):
+        """
+        Drone trajectories: a ring buffer of recent positions plus optional full history
+
+        Parameters:
+        -----------
+        n_tracks : int
+            Number of tracks (drones)
+        capacity : int
+            Number of recent positions kept per track
+        keep_history : bool
+            Also keep every position in an append-only chunked store
+        chunk_steps : int
+            Number of steps per history chunk
+        spill_dir : str, optional
+            Directory to which full history chunks are written as memory-mapped
+            .npy files, so that long missions don't hold the history in memory.
+            Each store writes to its own new subdirectory (see spill_path), so
+            several stores can share one spill_dir
+        """
+        self.n_tracks = n_tracks
+        self.capacity = capacity
+        self.ring = np.zeros((n_tracks, capacity, 2), dtype=np.float32)
+        self.head = 0  # Slot the next position is written to
+        self.length = 0
+
+        self.keep_history = keep_history
+        self.chunk_steps = chunk_steps
+        self.spill_dir = spill_dir
+        self.chunks = []
+        self._chunk = None
+        self._chunk_fill = 0
+        self.steps = 0
+        self.spill_path = None
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_path = tempfile.mkdtemp(prefix='track_history_', dir=spill_dir)
+
+    def append(self, positions):
+        """
+        Record one position per track
+
+        Parameters:
+        -----------
+        positions : np.ndarray
+            Positions, shape (n_tracks, 2)
+        """
+        self.ring[:, self.head] = positions
+        self.head = (self.head + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+        self.steps += 1
+
+        if self.keep_history:
+            if self._chunk is None:
+                self._chunk = np.empty((self.chunk_steps, self.n_tracks, 2), dtype=np.float32)
+                self._chunk_fill = 0
+            self._chunk[self._chunk_fill] = positions
+            self._chunk_fill += 1
+            if self._chunk_fill == self.chunk_steps:
+                self._seal_chunk()
+
+    def _seal_chunk(self):
+        """Move the filled chunk to the history, spilling it to disk if configured"""
+        chunk = self._chunk[:self._chunk_fill]
+        if self.spill_path is not None:
+            path = os.path.join(self.spill_path, f"track_history_{len(self.chunks):05d}.npy")
+            spilled = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=chunk.shape)
+            spilled[:] = chunk
+            spilled.flush()
+            del spilled
+            chunk = np.load(path, mmap_mode='r')
+        self.chunks.append(chunk)
+        self._chunk = None
+        self._chunk_fill = 0
+
+    def recent(self, track=None):
+        """
+        Get the recent positions in chronological order
+
+        Parameters:
+        -----------
+        track : int, optional
+            Track index; all tracks if omitted
+
+        Returns:
+        --------
+        np.ndarray
+            Positions, shape (length, 2) for one track or (n_tracks, length, 2)
+        """
+        order = (np.arange(self.head - self.length, self.head)) % self.capacity
+        if track is None:
+            return self.ring[:, order]
+        return self.ring[track, order]
+
+    def history(self, track=None, start=0):
+        """
+        Get every recorded position (requires keep_history)
+
+        Parameters:
+        -----------
+        track : int, optional
+            Track index; all tracks if omitted
+        start : int
+            First step to return; only the chunks from there on are read
+
+        Returns:
+        --------
+        np.ndarray
+            Positions, shape (steps, 2) for one track or (steps, n_tracks, 2)
+        """
+        if not self.keep_history:
+            raise ValueError("Full history is not kept; create the TrackStore with keep_history=True")
+        parts = list(self.chunks)
+        if self._chunk is not None:
+            parts.append(self._chunk[:self._chunk_fill])
+        first_chunk = min(start // self.chunk_steps, len(parts))
+        parts = parts[first_chunk:]
+        if parts:
+            parts[0] = parts[0][start - first_chunk * self.chunk_steps:]
+        if not parts:
+            history = np.empty((0, self.n_tracks, 2), dtype=np.float32)
+        else:
+            history = np.concatenate(parts)
+        return history if track is None else history[:, track]
+
+def get_zoom_tolerance(zoom, pixels=1.0):
+    """
+    Get the number of degrees spanned by screen pixels at a web map zoom level
+
+    Parameters:
+    -----------
+    zoom : float
+        Web Mercator zoom level (256-pixel tiles)
+    pixels : float
+        Number of pixels
+
+    Returns:
+    --------
+    float
+        Span in degrees of longitude (an upper bound for latitude)
+    """
+    return pixels * 360.0 / (256 * 2.0 ** zoom)
+
+def simplify_track(points, tolerance):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm
+
+    All segments of one recursion level are processed in a single batch:
+    the distances of their interior points are computed at once and every
+    segment whose farthest point lies beyond the tolerance is split there.
+
+    Parameters:
+    -----------
+    points : array-like
+        Vertices, shape (n, 2)
+    tolerance : float
+        Largest distance of a dropped vertex from the simplified line
+
+    Returns:
+    --------
+    np.ndarray
+        Kept vertices in order, always including the first and last
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points.copy()
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    while starts.size:
+        counts = ends - starts - 1
+        has_interior = counts > 0
+        starts, ends, counts = starts[has_interior], ends[has_interior], counts[has_interior]
+        if not starts.size:
+            break
+
+        # Interior vertices of every segment, grouped by segment
+        offsets = np.cumsum(counts) - counts
+        segment = np.repeat(np.arange(len(counts)), counts)
+        indices = starts[segment] + 1 + np.arange(counts.sum()) - offsets[segment]
+
+        # Distance of each vertex from its segment
+        a = points[starts[segment]]
+        ab = points[ends[segment]] - a
+        ap = points[indices] - a
+        length_sq = np.sum(ab * ab, axis=1)
+        t = np.clip(np.sum(ap * ab, axis=1) / np.where(length_sq > 0, length_sq, 1), 0, 1)
+        distance = np.hypot(ap[:, 0] - t * ab[:, 0], ap[:, 1] - t * ab[:, 1])
+
+        # Farthest vertex of each segment (the first one on ties)
+        farthest = np.maximum.reduceat(distance, offsets)
+        is_farthest = np.flatnonzero(distance == farthest[segment])
+        _, first = np.unique(segment[is_farthest], return_index=True)
+        split_points = indices[is_farthest[first]]
+
+        # Split the segments whose farthest vertex is beyond the tolerance
+        split = farthest > tolerance
+        split_points = split_points[split]
+        keep[split_points] = True
+        starts, ends = np.concatenate((starts[split], split_points)), np.concatenate((split_points, ends[split]))
+    return points[keep]
+
+class TrackLOD:
+    def __init__(self, n_tracks, chunk_points=1024):
+        """
+        Growing tracks with cached level-of-detail simplifications
+
+        Tracks are split into frozen chunks of chunk_points segments. Each
+        frozen chunk is simplified once per tolerance and cached, so getting
+        a simplified track only simplifies the unfinished tail anew.
+
+        Parameters:
+        -----------
+        n_tracks : int
+            Number of tracks (drones)
+        chunk_points : int
+            Number of segments per frozen chunk
+        """
+        self.n_tracks = n_tracks
+        self.chunk_points = chunk_points
+        # Frozen chunks share their last vertex with the start of the next one
+        self.chunks = [[] for _ in range(n_tracks)]
+        self.tails = [np.empty((0, 2)) for _ in range(n_tracks)]
+        self._simplified = {}
+
+    def append(self, positions):
+        """
+        Append new positions to every track
+
+        Parameters:
+        -----------
+        positions : np.ndarray
+            New positions, shape (steps, n_tracks, 2)
+        """
+        positions = np.asarray(positions, dtype=float)
+        for track in range(self.n_tracks):
+            tail = np.concatenate((self.tails[track], positions[:, track]))
+            while len(tail) > self.chunk_points:
+                self.chunks[track].append(tail[:self.chunk_points + 1])
+                tail = tail[self.chunk_points:]
+            self.tails[track] = tail
+
+    def get(self, track, tolerance):
+        """
+        Get a track simplified with a tolerance (see simplify_track)
+
+        Parameters:
+        -----------
+        track : int
+            Track index
+        tolerance : float
+            Largest distance of a dropped vertex from the simplified line
+
+        Returns:
+        --------
+        np.ndarray
+            Kept vertices, shape (k, 2)
+        """
+        cached = self._simplified.setdefault(tolerance, [[] for _ in range(self.n_tracks)])[track]
+        for chunk in self.chunks[track][len(cached):]:
+            cached.append(simplify_track(chunk, tolerance)[:-1])
+        return np.concatenate(cached + [simplify_track(self.tails[track], tolerance)])
@@ -0,0 +1,10 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+
+# Make the src package importable when pytest runs from any directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
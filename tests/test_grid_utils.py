@@ -0,0 +1,74 @@
+# tests/test_grid_utils.py
+
+import matplotlib.path as mpath
+import numpy as np
+import pytest
+
+from src.utils.grid_utils import AreaMask, FrontierIndex
+
+def random_polygon(rng, size):
+    """Star-shaped polygon with random vertices around the center of a size x size grid"""
+    n_vertices = rng.integers(3, 40)
+    angles = np.sort(rng.random(n_vertices)) * 2 * np.pi
+    radii = rng.random(n_vertices) * size / 2 + 0.3
+    return np.column_stack((size / 2 + radii * np.cos(angles), size / 2 + radii * np.sin(angles)))
+
+def contains_centers(polygon, size):
+    """Reference mask: matplotlib's point-in-polygon test at every cell center"""
+    centers = np.arange(size) + 0.5
+    x, y = np.meshgrid(centers, centers)
+    inside = mpath.Path(polygon).contains_points(np.column_stack((x.ravel(), y.ravel())))
+    return inside.reshape(size, size)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_area_mask_matches_contains_points(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        size = int(rng.integers(1, 90))
+        polygon = random_polygon(rng, size)
+        expected = contains_centers(polygon, size)
+        mask = AreaMask(polygon, (size, size), 1.0)
+
+        assert np.array_equal(mask.to_array(), expected)
+        assert len(mask) == expected.sum()
+        assert np.array_equal(mask.cells(), np.flatnonzero(expected))
+        assert np.array_equal(mask.contains(np.arange(size * size)), expected.ravel())
+        assert np.array_equal(mask.to_array(3), expected[::3, ::3])
+
+def test_area_mask_without_inside_cells():
+    # A thin strip that passes between the cell centers
+    mask = AreaMask([[0, 0], [10, 0], [10, 1], [0, 1]], (1, 1), 10.0)
+    assert len(mask) == 0
+    assert mask.cells().size == 0
+    assert not mask.to_array().any()
+    assert not mask.contains([0]).any()
+
+def test_frontier_samples_lowest_level_cells():
+    rng = np.random.default_rng(1)
+    polygon = np.array([(1, 1), (40, 3), (30, 37), (12, 20), (2, 35)], dtype=float)
+    mask = AreaMask(polygon, (40, 40), 1.0)
+    frontier = FrontierIndex(mask, tile_size=8)
+    cells = mask.cells()
+    values = np.zeros(40 * 40)
+
+    def check():
+        levels = frontier.get_levels(values[cells])
+        assert np.array_equal(frontier.counts, np.bincount(levels, minlength=frontier.n_levels))
+        lowest = cells[levels == levels.min()]
+        drawn = frontier.sample(20000, rng)
+        assert np.isin(drawn, lowest).all()
+        # Uniform over the lowest level: every cell of it is drawn
+        assert np.array_equal(np.unique(drawn), lowest)
+
+    for _ in range(30):
+        touched = rng.choice(cells, 50, replace=False)
+        values[touched] = np.minimum(1, values[touched] + rng.random(50) * 0.2)
+        frontier.update(touched, values[touched])
+    check()
+
+    # Raise every level-0 cell, so the lowest level changes and tiles are recounted
+    raised = cells[frontier.get_levels(values[cells]) == 0]
+    values[raised] = 0.06
+    frontier.update(raised, values[raised])
+    assert frontier.lowest_level() == 1
+    check()
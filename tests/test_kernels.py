@@ -0,0 +1,37 @@
+# tests/test_kernels.py
+
+import numpy as np
+import pytest
+
+from src.search_algorithm_v1 import DroneSearchSimulation
+from src.utils.kernel_utils import NUMBA_AVAILABLE, count_crossings
+
+requires_numba = pytest.mark.skipif(not NUMBA_AVAILABLE, reason="Numba is not installed")
+
+# About 1 km square search area
+AREA = [(78.0, 20.0), (78.01, 20.0), (78.01, 20.01), (78.0, 20.01)]
+
+def run_steps(backend, coverage_dtype, steps=80):
+    simulation = DroneSearchSimulation(AREA, n_drones=20, seed=0, grid_resolution=200, projection='utm',
+                                       coverage_dtype=coverage_dtype, kernel_backend=backend)
+    for _ in range(steps):
+        simulation.simulate_step(output='delta')
+    return simulation
+
+@requires_numba
+@pytest.mark.parametrize('coverage_dtype', ['float64', 'float32', 'uint16', 'uint8'])
+def test_numba_matches_numpy(coverage_dtype):
+    numpy_run = run_steps('numpy', coverage_dtype)
+    numba_run = run_steps('numba', coverage_dtype)
+    assert np.array_equal(numpy_run.exploration_grid, numba_run.exploration_grid)
+    assert np.array_equal(numpy_run.drone_positions, numba_run.drone_positions)
+    assert numpy_run.covered_cells == numba_run.covered_cells
+
+@requires_numba
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_count_crossings_at_threshold(dtype):
+    # A value stored at exactly the threshold is not above it in either backend
+    old_values = np.zeros(3, dtype=dtype)
+    new_values = np.array([0.2, 0.3, 0.1], dtype=dtype)
+    expected = count_crossings(old_values, new_values, 0.2, 'numpy')
+    assert count_crossings(old_values, new_values, 0.2, 'numba') == expected
@@ -0,0 +1,59 @@
+# tests/test_search_algorithm.py
+
+import numpy as np
+import pytest
+
+from src.search_algorithm_v1 import DroneSearchSimulation
+
+# About 1 km square search area, and a concave one whose edges avoid the cell centers
+SQUARE = [(78.0, 20.0), (78.01, 20.0), (78.01, 20.01), (78.0, 20.01)]
+CONCAVE = [(78.0003, 20.0002), (78.0097, 20.0011), (78.0051, 20.0049), (78.0093, 20.0094), (78.0007, 20.0088)]
+
+def update_grid_loop(simulation, grid):
+    """The original per-cell scan loop, applied to a dense grid"""
+    resolution = simulation.grid_resolution
+    cell_size = simulation.grid_size / resolution
+    scan_cell_radius = int(simulation.scan_radius * 5 / simulation.grid_size * resolution)
+    for x, y in simulation.drone_positions:
+        grid_x = max(0, min(resolution - 1, int(x / simulation.grid_size * resolution)))
+        grid_y = max(0, min(resolution - 1, int(y / simulation.grid_size * resolution)))
+        for dx in range(-scan_cell_radius, scan_cell_radius + 1):
+            for dy in range(-scan_cell_radius, scan_cell_radius + 1):
+                nx = grid_x + dx
+                ny = grid_y + dy
+                if (0 <= nx < resolution and 0 <= ny < resolution and
+                        dx*dx + dy*dy <= scan_cell_radius*scan_cell_radius):
+                    point = [(nx + 0.5) * cell_size, (ny + 0.5) * cell_size]
+                    if simulation.area_path.contains_points([point])[0]:
+                        dist = np.sqrt(dx*dx + dy*dy) / scan_cell_radius
+                        effect = 0.2 * max(0, 1 - dist)
+                        grid[ny, nx] = min(1.0, grid[ny, nx] + effect)
+
+@pytest.mark.parametrize('area', [SQUARE, CONCAVE])
+@pytest.mark.parametrize('coverage_store', ['dense', 'tiled'])
+def test_update_grid_matches_loop(area, coverage_store):
+    # Metric frame, where the scan footprint is a few cells across
+    simulation = DroneSearchSimulation(area, n_drones=8, seed=0, grid_resolution=150, projection='utm',
+                                       coverage_store=coverage_store, kernel_backend='numpy')
+    rng = np.random.default_rng(0)
+    expected = np.zeros((150, 150))
+    for _ in range(10):
+        # Spread drones over the whole grid, including beyond the area
+        simulation.drone_positions[:] = rng.random((8, 2)) * simulation.grid_size
+        simulation.update_grid()
+        update_grid_loop(simulation, expected)
+    assert expected.any()
+    assert np.array_equal(simulation.exploration_grid, expected)
+
+@pytest.mark.parametrize('coverage_dtype', ['float64', 'float32', 'uint16', 'uint8'])
+@pytest.mark.parametrize('coverage_store', ['dense', 'tiled'])
+def test_covered_cells_match_grid(coverage_dtype, coverage_store):
+    simulation = DroneSearchSimulation(SQUARE, n_drones=20, seed=0, grid_resolution=200, projection='utm',
+                                       coverage_dtype=coverage_dtype, coverage_store=coverage_store,
+                                       kernel_backend='numpy')
+    for _ in range(80):
+        simulation.simulate_step(output='delta')
+    grid = simulation.exploration_grid
+    inside = simulation.inside_mask
+    threshold = grid.dtype.type(simulation.coverage_threshold)
+    assert simulation.covered_cells == np.count_nonzero(grid[inside] > threshold)